@@ -0,0 +1,67 @@
+'''
+Definitions shared by the backup, verify, restore and reporting scripts
+'''
+
+import threading
+import contextlib
+import concurrent.futures
+
+GB = 1024 * 1024 * 1024
+
+# rclone --links stores symlinks as objects with this suffix, containing the target
+RCLONE_LINK_SUFFIX = ".rclonelink"
+
+
+class TaskTree:
+    """
+    Thread pool for tasks that submit more tasks (directory walks, prefix descents).  A task's children are
+    submitted before it returns, so when the pending count reaches zero everything is done - wait() returns,
+    and on_finished is called from the last task's thread.  Exceptions are kept as (args, exception) in errors.
+    """
+    def __init__(self, parallelism, on_finished=None):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=parallelism)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.errors = []
+        self.finished = threading.Event()
+        self.on_finished = on_finished
+
+    @contextlib.contextmanager
+    def seeding(self):
+        """Hold a pending slot while submitting the first tasks, so an early finisher can't signal completion"""
+        with self.lock:
+            self.pending += 1
+        try:
+            yield self
+        finally:
+            self._task_done()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            self.pending += 1
+        self.executor.submit(self._run, fn, args)
+
+    def _run(self, fn, args):
+        try:
+            fn(*args)
+        except Exception as exc:
+            with self.lock:
+                self.errors.append((args, exc))
+        finally:
+            self._task_done()
+
+    def _task_done(self):
+        with self.lock:
+            self.pending -= 1
+            finished = self.pending == 0
+        if finished:
+            self.finished.set()
+            if self.on_finished:
+                self.on_finished()
+
+    def wait(self):
+        self.finished.wait()
+
+    def shutdown(self, cancel=False):
+        """Wait for the workers - with cancel, drop queued tasks and return at once"""
+        self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
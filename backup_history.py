@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+
+'''
+Per-share backup history for fss_backup.py, kept in a local SQLite database
+
+Each share run records its duration, the bytes and files rclone transferred, and the share size at the time.
+That history predicts how long a share will take next time, which is a much better scheduling key than
+metered_bytes: a share with many small changed files can take longer than a larger share of static data.
+
+Prediction, in order of preference:
+    - median duration of the share's last few runs of the same type
+    - the share's size at the seconds-per-byte rate seen across all shares for that type
+    - unknown (None) - these are scheduled as if they were the longest
+
+Inspect it with:
+ $> python3 backup_history.py --db fss_backup_history.db
+'''
+
+import os
+import sqlite3
+import argparse
+import statistics
+
+from backup_common import GB
+
+# Default database, next to the scripts
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fss_backup_history.db")
+
+# Runs of a share considered for its prediction
+RECENT_RUNS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    share_id TEXT NOT NULL,
+    share_name TEXT NOT NULL,
+    backup_type TEXT NOT NULL,
+    started TEXT NOT NULL,
+    duration REAL NOT NULL,
+    metered_bytes INTEGER,
+    bytes_transferred INTEGER,
+    files_transferred INTEGER,
+    ok INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_share ON runs (share_id, backup_type, started);
+"""
+
+
+def open_history(path=DEFAULT_DB):
+    """Open (creating if needed) the history database"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def record_run(conn, share_id, share_name, backup_type, started, duration, metered_bytes,
+               bytes_transferred, files_transferred, ok):
+    conn.execute("INSERT INTO runs (share_id, share_name, backup_type, started, duration, metered_bytes, "
+                 "bytes_transferred, files_transferred, ok) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 (share_id, share_name, backup_type, started.isoformat(), duration, metered_bytes,
+                  bytes_transferred, files_transferred, 1 if ok else 0))
+    conn.commit()
+
+def seconds_per_byte(conn, backup_type):
+    """Rate across all successful runs of the type - None without history"""
+    total_duration, total_bytes = conn.execute(
+        "SELECT SUM(duration), SUM(metered_bytes) FROM runs WHERE backup_type = ? AND ok = 1 AND metered_bytes > 0",
+        (backup_type,)).fetchone()
+    if not total_duration or not total_bytes:
+        return None
+    return total_duration / total_bytes
+
+def predict_duration(conn, share_id, backup_type, metered_bytes, rate=None):
+    """Predicted seconds for the share, or None when nothing is known"""
+    durations = [row[0] for row in conn.execute(
+        "SELECT duration FROM runs WHERE share_id = ? AND backup_type = ? AND ok = 1 ORDER BY started DESC LIMIT ?",
+        (share_id, backup_type, RECENT_RUNS))]
+    if durations:
+        return statistics.median(durations)
+    if rate is None:
+        rate = seconds_per_byte(conn, backup_type)
+    if rate is None:
+        return None
+    return metered_bytes * rate
+
+def order_by_duration(shares, predictions, longest_first):
+    """
+    Sort shares by predicted duration (predictions keyed by share OCID).  Unknown predictions go first
+    either way, since they may well be the longest and are the ones that need a measurement.
+    """
+    known = [share for share in shares if predictions[share.id] is not None]
+    unknown = [share for share in shares if predictions[share.id] is None]
+    known.sort(key=lambda share: predictions[share.id], reverse=longest_first)
+    return unknown + known
+
+def pack_lanes(shares, predictions, lanes):
+    """
+    Longest processing time first packing into lanes (eg separate hosts or cron entries running in parallel).
+    Returns [(predicted seconds, [shares])] per lane.  Unknowns count as the longest known prediction.
+    """
+    longest = max([seconds for seconds in predictions.values() if seconds is not None], default=0)
+    packed = [[0, []] for _ in range(max(lanes, 1))]
+    for share in order_by_duration(shares, predictions, longest_first=True):
+        lane = min(packed, key=lambda entry: entry[0])
+        seconds = predictions[share.id]
+        lane[0] += seconds if seconds is not None else longest
+        lane[1].append(share)
+    return [(seconds, lane_shares) for seconds, lane_shares in packed]
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}h{(seconds % 3600) // 60:02d}m{seconds % 60:02d}s"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="history database", default=DEFAULT_DB)
+    parser.add_argument("-n", "--last", type=int, help="runs to show", default=20)
+    args = parser.parse_args()
+
+    conn = open_history(args.db)
+    for started, share_name, backup_type, duration, bytes_transferred, files_transferred, ok in conn.execute(
+            "SELECT started, share_name, backup_type, duration, bytes_transferred, files_transferred, ok "
+            "FROM runs ORDER BY started DESC LIMIT ?", (args.last,)):
+        print(f"{started} {share_name:<30} {backup_type:<8} {format_duration(duration):>10} | "
+              f"{(bytes_transferred or 0) / GB:.2f} GB | {files_transferred or 0} files | {'OK' if ok else 'FAILED'}")
@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+'''
+Startup time benchmark - plain `import oci` versus the oci_clients lazy import
+
+Each case runs in a fresh interpreter (so nothing is cached in-process) and the median wall time is reported.
+The "client" cases also read the OCI config and build an Object Storage client, which is what every
+script does before its first request.  No API calls are made.
+
+ $> python3 bench_startup.py -n 20 > bench_output.txt
+ $> python3 bench_startup.py -n 20 --client -pr MYPROFILE
+'''
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def cases(client, profile):
+    profile_arg = repr(profile) if profile else "None"
+    eager = "import oci"
+    lazy = "import oci_clients"
+    if client:
+        eager += (f"; cfg = oci.config.from_file(profile_name={profile_arg}) if {profile_arg} else oci.config.from_file()"
+                  "; oci.object_storage.ObjectStorageClient(cfg)")
+        lazy += f"; oci_clients.object_storage_client({profile_arg})"
+    return [("import oci (all services)", eager), ("oci_clients (lazy)", lazy)]
+
+def run_case(code, runs):
+    """Median and min wall time of a fresh interpreter running the code"""
+    env = dict(os.environ)
+    # The lazy case sets this itself - make sure the eager case really is eager
+    env.pop("OCI_PYTHON_SDK_NO_SERVICE_IMPORTS", None)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--runs", type=int, help="runs per case", default=10)
+    parser.add_argument("-c", "--client", help="also read config and build an Object Storage client", action="store_true")
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    args = parser.parse_args()
+
+    # Baseline interpreter start, subtracted from the results
+    baseline, _ = run_case("pass", args.runs)
+    print(f"Python startup: {baseline * 1000:.1f} ms (median of {args.runs})", flush=True)
+    results = []
+    for name, code in cases(args.client, args.profile):
+        median, fastest = run_case(code, args.runs)
+        results.append(median - baseline)
+        print(f"{name:<28} median: {(median - baseline) * 1000:8.1f} ms | min: {(fastest - baseline) * 1000:8.1f} ms", flush=True)
+    if results[1] > 0:
+        print(f"Speedup: {results[0] / results[1]:.1f}x", flush=True)
@@ -0,0 +1,208 @@
+#! /usr/bin/env python3
+
+'''
+Prefix-partitioned parallel listing of an OSS bucket
+
+A single list_objects cursor is serial, so very large buckets take a long time to enumerate.
+This splits the key space into ranges and lists them concurrently, merging everything into one stream:
+    - the known backup prefixes (FSS-dailyBackup/, FSS-weekly..., FSS-monthly...) are descended with
+      delimiter "/" listings, and each discovered sub-prefix becomes its own partition
+    - the key ranges between the known prefixes are listed with start/end so nothing is missed or repeated
+
+Used by clean_bucket.py (--partitioned), and usable standalone to count a bucket:
+ $> python3 bucket_lister.py -b share_backup -p 16 --versions
+'''
+
+import os
+import time
+import queue
+import threading
+import argparse
+
+from backup_common import GB, TaskTree
+
+# Backup prefixes written by fss_backup.py - these hold nearly all of the objects
+KNOWN_PREFIXES = ["FSS-dailyBackup/", "FSS-monthly", "FSS-weekly"]
+
+# Delimiter used to discover sub-prefixes
+DELIMITER = "/"
+
+
+def prefix_end(prefix):
+    """Smallest name greater than every name starting with prefix (exclusive end of the range)"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def list_range_pages(object_storage_client, namespace_name, bucket_name, fields, versions,
+                     prefix=None, start=None, end=None, delimiter=None):
+    """
+    Page through one range of the bucket - yields (objects, prefixes) per page.
+    Objects use next_start_with, versions use opc-next-page.
+    """
+    next_start = start
+    page = None
+    while True:
+        if versions:
+            response = object_storage_client.list_object_versions(
+                namespace_name=namespace_name,
+                bucket_name=bucket_name,
+                prefix=prefix,
+                start=start,
+                end=end,
+                delimiter=delimiter,
+                page=page,
+                fields=fields
+            )
+            yield response.data.items, response.data.prefixes or []
+            page = response.next_page
+            if page is None:
+                return
+        else:
+            response = object_storage_client.list_objects(
+                namespace_name=namespace_name,
+                bucket_name=bucket_name,
+                prefix=prefix,
+                start=next_start,
+                end=end,
+                delimiter=delimiter,
+                fields=fields
+            )
+            yield response.data.objects, response.data.prefixes or []
+            next_start = response.data.next_start_with
+            if next_start is None:
+                return
+
+def classify_versions(tagged_pages):
+    """
+    Generator over (partition, versions) pages - yields a list of (version, is_current, superseded_at) per page.
+    Versions of a name arrive newest first, and within a partition names arrive in order, so one (name, time)
+    per partition tells the newest version of each name (is_current, a delete marker if the name is deleted)
+    from previous ones, and when each previous version was superseded by the next newer one.
+    """
+    last_seen = {}
+    for partition, versions in tagged_pages:
+        last_name, newer_time = last_seen.get(partition, (None, None))
+        classified = []
+        for version in versions:
+            is_current = version.name != last_name
+            classified.append((version, is_current, None if is_current else newer_time))
+            last_name, newer_time = version.name, version.time_created
+        last_seen[partition] = (last_name, newer_time)
+        yield classified
+
+def plan_partitions(prefix=None):
+    """
+    Split the key space (or just the given prefix) into seed prefixes to descend and
+    the start/end ranges between them.  Returns (seeds, ranges).
+    """
+    low, high = (prefix, prefix_end(prefix)) if prefix else (None, None)
+    seeds = sorted(known for known in KNOWN_PREFIXES
+                   if (low is None or known >= low) and (high is None or known < high))
+    if prefix and not any(known.startswith(prefix) for known in seeds):
+        # The prefix sits inside (or away from) the known ones - descend the prefix itself
+        return [prefix], []
+
+    ranges = []
+    cursor = low
+    for seed in seeds:
+        if cursor is None or cursor < seed:
+            ranges.append((cursor, seed))
+        cursor = prefix_end(seed)
+    if high is None or cursor < high:
+        ranges.append((cursor, high))
+    return seeds, ranges
+
+def partitioned_pages(object_storage_client, namespace_name, bucket_name, prefix=None, depth=2,
+                      parallelism=8, fields="name", versions=False, max_pages=16, verbose=False, tagged=False):
+    """
+    Generator over pages (lists of ObjectSummary, or ObjectVersionSummary with versions=True)
+    from all partitions, listed concurrently.  Page order across partitions is not defined, but
+    pages within a partition arrive in name order - tagged=True yields (partition, page) so
+    callers can keep per-partition state.
+    """
+    page_queue = queue.Queue(maxsize=max_pages)
+    done = object()
+    stop = threading.Event()
+    # Sub-prefixes are submitted before their parent finishes, so finishing means everything is listed
+    tasks = TaskTree(parallelism, on_finished=lambda: emit(done))
+
+    def emit(objects, partition=None):
+        if tagged and objects is not done:
+            objects = (partition, objects)
+        # Give up if the consumer went away, rather than blocking forever on a full queue
+        while not stop.is_set():
+            try:
+                page_queue.put(objects, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def list_range(start, end):
+        for objects, _ in list_range_pages(object_storage_client, namespace_name, bucket_name, fields, versions,
+                                           start=start, end=end):
+            if stop.is_set():
+                return
+            if objects:
+                emit(objects, ("range", start))
+
+    def descend(sub_prefix, remaining):
+        # Objects directly under this prefix come back with the delimiter listing, sub-prefixes become partitions
+        delimiter = DELIMITER if remaining > 0 else None
+        for objects, prefixes in list_range_pages(object_storage_client, namespace_name, bucket_name, fields, versions,
+                                                  prefix=sub_prefix, delimiter=delimiter):
+            if stop.is_set():
+                return
+            if objects:
+                emit(objects, ("prefix", sub_prefix))
+            for child in prefixes:
+                if verbose:
+                    print(f"{os.getpid()} Partition: {child}", flush=True)
+                tasks.submit(descend, child, remaining - 1)
+
+    seeds, ranges = plan_partitions(prefix)
+    with tasks.seeding():
+        for seed in seeds:
+            tasks.submit(descend, seed, depth)
+        for start, end in ranges:
+            tasks.submit(list_range, start, end)
+
+    try:
+        while True:
+            page = page_queue.get()
+            if page is done:
+                break
+            yield page
+        if tasks.errors:
+            raise tasks.errors[0][1]
+    finally:
+        stop.set()
+        tasks.shutdown(cancel=True)
+
+if __name__ == '__main__':
+    import oci_clients
+
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
+    parser.add_argument("-p", "--parallelism", type=int, help="concurrent listings", default=8)
+    parser.add_argument("-d", "--depth", type=int, help="delimiter levels to split known prefixes by", default=2)
+    parser.add_argument("-px", "--prefix", type=str, help="only list names starting with this")
+    parser.add_argument("-ve", "--versions", help="list object versions", action="store_true")
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    args = parser.parse_args()
+
+    # Define OSS client and Namespace
+    object_storage_client = oci_clients.object_storage_client(args.profile)
+    namespace_name = oci_clients.get_namespace(args.profile)
+
+    count = 0
+    total_bytes = 0
+    start = time.time()
+    for objects in partitioned_pages(object_storage_client, namespace_name, args.bucket, prefix=args.prefix,
+                                     depth=args.depth, parallelism=args.parallelism, fields="name,size",
+                                     versions=args.versions, verbose=args.verbose):
+        count += len(objects)
+        total_bytes += sum(obj.size or 0 for obj in objects)
+    end = time.time()
+    print(f"{os.getpid()} Listed {count} {'versions' if args.versions else 'objects'} | {total_bytes / GB:.2f} GB | "
+          f"Time taken: {(end - start):.2f}s | Rate: {count / max(end - start, 0.001):.1f} objects/s", flush=True)
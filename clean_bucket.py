@@ -4,98 +4,294 @@
 Cleans out an OSS bucket
 No regard for what is in it
 Operates with parallelism 
+
+Listing pages (names only) are fetched ahead by a lister thread, following next_start_with,
+while deletes are fed through a bounded in-flight window.  Failed deletes are retried.
+
+For versioned buckets, --versions deletes every object version (so the bucket can actually be emptied)
+and --multipart aborts uncommitted multipart uploads.  --prefix and --olderthan narrow any of these
+down for retention pruning, eg only FSS-weekly* older than 60 days:
+ $> clean_bucket.py -b share_backup --versions --prefix FSS-weekly --olderthan 60
+
+With --versions and --olderthan, only previous versions are aged (by when a newer version replaced them,
+as lifecycle rules do) - the current version of a name is kept, since rclone never re-uploads an unchanged
+file and it may well be the only copy.  Add --includecurrent to age current versions by creation time too.
 '''
 
 import time
-import os
-import oci
+import datetime
 import os
 
 import argparse
 import concurrent.futures
+import queue
 import threading
 
+import oci_clients
+from oci_clients import oci
+from bucket_lister import classify_versions, list_range_pages, partitioned_pages
+
 # The Compartment OCID
 compartment_id = None
 
 # The Bucket name where we will upload
 bucket_name = None
 
+# Seconds between progress reports
+REPORT_INTERVAL = 10
+
 
-def deleteObject(object_storage_client,namespace_name,bucket_name,object_name ):
+def deleteObject(object_storage_client,namespace_name,bucket_name,task ):
+    """Delete one task - ("object", name, None), ("version", name, version_id) or ("multipart", name, upload_id)"""
+    kind, object_name, task_id = task
     #print(f"{threading.get_ident()} | Delete: {object_name}")
-    object_storage_client.delete_object(
-        namespace_name=namespace_name,
-        bucket_name=bucket_name,
-        object_name=object_name
-    )
+    try:
+        if kind == "multipart":
+            object_storage_client.abort_multipart_upload(
+                namespace_name=namespace_name,
+                bucket_name=bucket_name,
+                object_name=object_name,
+                upload_id=task_id
+            )
+        else:
+            object_storage_client.delete_object(
+                namespace_name=namespace_name,
+                bucket_name=bucket_name,
+                object_name=object_name,
+                version_id=task_id
+            )
+    except oci.exceptions.ServiceError as exc:
+        # Already gone is as good as deleted
+        if exc.status != 404:
+            raise
+
+def wanted(object_name, time_created):
+    """Prefix and age filters - everything matches when neither is set"""
+    if prefix and not object_name.startswith(prefix):
+        return False
+    if older_than and time_created > older_than:
+        return False
+    return True
+
+def version_tasks(classified, older_than=None, include_current=False, prefix=None):
+    """
+    Delete tasks for a page of (version, is_current, superseded_at) from classify_versions.  Without a cutoff
+    every version goes.  With one, previous versions are aged from when they stopped being current, and the
+    current version (or the delete marker hiding the name) only goes with include_current.
+    """
+    tasks = []
+    for ver, is_current, superseded_at in classified:
+        if prefix and not ver.name.startswith(prefix):
+            continue
+        if older_than is None:
+            delete = True
+        elif is_current:
+            delete = include_current and ver.time_created <= older_than
+        else:
+            delete = superseded_at <= older_than
+        if delete:
+            tasks.append(("version", ver.name, ver.version_id))
+    return tasks
 
-# Main routine
+def object_pages(object_storage_client, namespace_name, bucket_name):
+    """Current objects - page with start=next_start_with"""
+    next_start = None
+    while True:
+        list_objects_response = object_storage_client.list_objects(
+            namespace_name=namespace_name,
+            bucket_name=bucket_name,
+            prefix=prefix,
+            start=next_start,
+            fields="name,timeCreated" if older_than else "name"
+        )
+        yield [("object", obj.name, None) for obj in list_objects_response.data.objects
+               if wanted(obj.name, obj.time_created)]
+        next_start = list_objects_response.data.next_start_with
+        if next_start is None:
+            return
+
+def version_pages(object_storage_client, namespace_name, bucket_name):
+    """Every object version (including delete markers) - page with opc-next-page"""
+    pages = ((None, items) for items, _ in list_range_pages(object_storage_client, namespace_name, bucket_name,
+                                                            "name,timeCreated", True, prefix=prefix))
+    for classified in classify_versions(pages):
+        yield version_tasks(classified, older_than, include_current, prefix)
+
+def partitioned_task_pages(object_storage_client, namespace_name, bucket_name):
+    """Objects or versions from the prefix-partitioned parallel lister"""
+    pages = partitioned_pages(object_storage_client, namespace_name, bucket_name, prefix=prefix,
+                              parallelism=list_parallelism, fields="name,timeCreated" if older_than or versions else "name",
+                              versions=versions, verbose=verbose, tagged=True)
+    if versions:
+        for classified in classify_versions(pages):
+            yield version_tasks(classified, older_than, include_current, prefix)
+    else:
+        for _, objects in pages:
+            yield [("object", obj.name, None) for obj in objects if wanted(obj.name, obj.time_created)]
+
+def multipart_pages(object_storage_client, namespace_name, bucket_name):
+    """Outstanding (uncommitted) multipart uploads - page with opc-next-page"""
+    page = None
+    while True:
+        list_uploads_response = object_storage_client.list_multipart_uploads(
+            namespace_name=namespace_name,
+            bucket_name=bucket_name,
+            page=page
+        )
+        yield [("multipart", upload.object, upload.upload_id) for upload in list_uploads_response.data
+               if wanted(upload.object, upload.time_created)]
+        page = list_uploads_response.next_page
+        if page is None:
+            return
+
+def list_pages(page_sources, page_queue):
+    """Lister thread - run each page source in turn and queue its pages of tasks"""
+    iteration = 0
+    try:
+        for page_source in page_sources:
+            for tasks in page_source:
+                # Blocks when the deletes fall behind - keeps memory bounded
+                page_queue.put(tasks)
+                if verbose:
+                    print(f"{os.getpid()} Listed page: {iteration} | Tasks: {len(tasks)}", flush=True)
+                iteration += 1
+    except Exception as exc:
+        # Hand the failure to the main thread rather than dying silently
+        page_queue.put(exc)
+    page_queue.put(None)
 
-# Parse Arguments
-parser = argparse.ArgumentParser()
-parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
-parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
-parser.add_argument("-p", "--parallelism", type=int, help="parallel processes allowed", default=5)
-args = parser.parse_args()
+if __name__ == '__main__':
 
-# Process arguments
-verbose = args.verbose
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
+    parser.add_argument("-p", "--parallelism", type=int, help="parallel processes allowed", default=5)
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    parser.add_argument("-w", "--window", type=int, help="max deletes in flight (default 4x parallelism)")
+    parser.add_argument("-pf", "--prefetch", type=int, help="listing pages to fetch ahead", default=4)
+    parser.add_argument("-rt", "--retries", type=int, help="retries for a failed delete", default=3)
+    parser.add_argument("-ve", "--versions", help="delete every object version, not just current objects", action="store_true")
+    parser.add_argument("-mp", "--multipart", help="also abort uncommitted multipart uploads", action="store_true")
+    parser.add_argument("-px", "--prefix", type=str, help="only objects whose name starts with this")
+    parser.add_argument("-o", "--olderthan", type=int, help="only objects (versions, uploads) created more than this many days ago")
+    parser.add_argument("-ic", "--includecurrent", help="with --versions --olderthan, also delete current versions older than the cutoff",
+        action="store_true")
+    parser.add_argument("-pl", "--partitioned", type=int, metavar="LISTERS",
+        help="list with this many concurrent prefix partitions instead of one cursor (very large buckets)")
+    args = parser.parse_args()
 
-# Bucket Name
-if args.bucket:
-    bucket_name = args.bucket
+    # Process arguments
+    verbose = args.verbose
 
-# Parallelism
-concurrency = args.parallelism
+    # Default(None) or named
+    profile = args.profile
 
-# Define OSS client and Namespace
-config = oci.config.from_file()
-object_storage_client = oci.object_storage.ObjectStorageClient(config)
-namespace_name = object_storage_client.get_namespace().data
+    # Bucket Name
+    if args.bucket:
+        bucket_name = args.bucket
 
+    # Parallelism
+    concurrency = args.parallelism
 
+    # In flight window
+    window = args.window if args.window else concurrency * 4
 
-# Main loop - delete objects, then if more, repeat on that until gone
-with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-    futures = []
+    # Retries
+    retries = args.retries
+
+    # Partitioned listing
+    list_parallelism = args.partitioned
+    versions = args.versions
+
+    # Filters - prefix and creation time cutoff
+    prefix = args.prefix
+    older_than = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=args.olderthan) if args.olderthan is not None else None
+    include_current = args.includecurrent
+
+    # Define OSS client and Namespace - one pooled connection per delete and lister thread
+    oci_clients.set_pool_size(concurrency + (list_parallelism or 1))
+    object_storage_client = oci_clients.object_storage_client(profile)
+    namespace_name = oci_clients.get_namespace(profile)
+
+    # What to list - versions include the current ones, so never list both
+    if list_parallelism:
+        page_sources = [partitioned_task_pages(object_storage_client, namespace_name, bucket_name)]
+    elif versions:
+        page_sources = [version_pages(object_storage_client, namespace_name, bucket_name)]
+    else:
+        page_sources = [object_pages(object_storage_client, namespace_name, bucket_name)]
+    if args.multipart:
+        page_sources.append(multipart_pages(object_storage_client, namespace_name, bucket_name))
+
+    print(f"{os.getpid()} Deleting {'all versions' if args.versions else 'current objects'}{' and multipart uploads' if args.multipart else ''} "
+          f"in {bucket_name}{f' with prefix {prefix}' if prefix else ''}{f' older than {args.olderthan} days' if older_than else ''}"
+          f"{' (current versions kept)' if versions and older_than and not include_current else ''}", flush=True)
+
+    # Lister runs ahead of the deletes, bounded by the page queue
+    page_queue = queue.Queue(maxsize=args.prefetch)
+    lister = threading.Thread(target=list_pages, args=(page_sources, page_queue), daemon=True)
 
     obj_count = 0
-    iteration = 0
+    failed_count = 0
+    retry_count = 0
+    listing_error = None
     start = time.time()
-    more_to_do = True
-    while more_to_do:
-        print(f"{os.getpid()} Iteration: {iteration}")
-        # Initial bucket List - response element count limited by API
-        list_objects_response = object_storage_client.list_objects(
-            namespace_name=object_storage_client.get_namespace().data,
-            bucket_name=bucket_name
-        )
+    last_report = start
+
+    # Main loop - take pages from the lister, keep at most window deletes in flight, reap as they finish
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # future -> (task, attempt)
+        in_flight = {}
+
+        def submit(task, attempt):
+            future = executor.submit(deleteObject, object_storage_client, namespace_name, bucket_name, task)
+            in_flight[future] = (task, attempt)
+
+        def reap(return_when):
+            """Wait for in-flight deletes, count them and resubmit failures"""
+            global obj_count, failed_count, retry_count
+            done, _ = concurrent.futures.wait(list(in_flight), return_when=return_when)
+            for future in done:
+                task, attempt = in_flight.pop(future)
+                if future.exception() is None:
+                    obj_count += 1
+                    if verbose:
+                        print(f"{os.getpid()} Deleted {task[0]}: {task[1]}{f' ({task[2]})' if task[2] else ''}")
+                elif attempt < retries:
+                    retry_count += 1
+                    if verbose:
+                        print(f"{os.getpid()} Retry {attempt + 1} of delete: {task[1]} | {future.exception()}")
+                    submit(task, attempt + 1)
+                else:
+                    failed_count += 1
+                    print(f"{os.getpid()} ERROR: Delete failed: {task[1]}{f' ({task[2]})' if task[2] else ''} | {future.exception()}", flush=True)
 
-        for obj in list_objects_response.data.objects:
-            if verbose:
-                print(f"{os.getpid()} Iter: {iteration} | Object Delete: {obj.name}")
-            futures.append(executor.submit(deleteObject, object_storage_client,namespace_name,bucket_name,obj.name))
-            obj_count += 1
-        iteration += 1
-        # Ternary - to control loop
-        more_to_do = True if list_objects_response.data.next_start_with != None else False
-        print(f"Control data: {list_objects_response.data.next_start_with} | Var: {more_to_do}")
-        # while list_objects_response.data.next_start_with != None:
-        #     print(f"{os.getpid()} Performing another iteration of List/delete: {list_objects_response.data.next_start_with}")
-        #     list_objects_response2 = object_storage_client.list_objects(
-        #         namespace_name=namespace_name,
-        #         bucket_name=bucket_name,
-        #         start=list_objects_response.data.next_start_with
-        #     )  
-
-        #     for obj in list_objects_response2.data.objects:
-        #         print(f"{os.getpid()} Object Delete: {obj.name}")
-        #         futures.append(executor.submit(deleteObject, object_storage_client,namespace_name,bucket_name,obj.name))
-        #         count += 1
+        lister.start()
+        while True:
+            page = page_queue.get()
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                listing_error = page
+                continue
+            for task in page:
+                while len(in_flight) >= window:
+                    reap(concurrent.futures.FIRST_COMPLETED)
+                submit(task, 0)
+
+            now = time.time()
+            if now - last_report >= REPORT_INTERVAL:
+                print(f"{os.getpid()} Deleted: {obj_count} | Failed: {failed_count} | In flight: {len(in_flight)} | "
+                      f"Rate: {obj_count / (now - start):.1f} objects/s", flush=True)
+                last_report = now
+
+        # Drain - retries may add more, so loop until nothing is left
+        while in_flight:
+            reap(concurrent.futures.ALL_COMPLETED)
     end = time.time()
-for result in futures:
-    if verbose:
-        print (f"Result {result}")
-if verbose:
-    print(f"{os.getpid()} Count of deleted objects: {obj_count}  | Time taken: {(end - start):.2f}s",flush=True)  
+
+    if listing_error:
+        print(f"{os.getpid()} ERROR: Listing stopped early: {listing_error}", flush=True)
+    print(f"{os.getpid()} Count of deleted objects: {obj_count} | Failed: {failed_count} | Retries: {retry_count} | "
+          f"Time taken: {(end - start):.2f}s | Rate: {obj_count / max(end - start, 0.001):.1f} objects/s", flush=True)
@@ -8,6 +8,14 @@ For each share
     call out to rclone
     unmount
     fire event (nice to have)
+
+Run once (eg from cron), or with --daemon to stay up: clients, namespace and the mount target's export index
+are kept between runs (shares are listed fresh each run), daily/weekly/monthly runs are scheduled internally,
+and a local HTTP endpoint (GET /status) reports the current share, progress and last run results.
+
+The work is done by FssBackup, which can also be driven from other code (from any thread):
+    backup = FssBackup(build_parser().parse_args([...]))
+    backup.run("daily")
 '''
 
 import time
@@ -17,11 +25,28 @@ import subprocess
 import multiprocessing
 import argparse
 import sys
-import oci
+import re
+import json
+import signal
+import sqlite3
+import tempfile
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import oci_clients
+from oci_clients import oci
+from backup_common import GB
+import fss_verify
+import backup_history
+import snapshot_diff
 
 ########### CONSTANTS ############################
 SNAPSHOT_NAME = "FSS-dailyBackup"
 
+# Incremental runs name snapshots <prefix><timestamp> and tag the one kept for the next run
+INCREMENTAL_PREFIX = f"{SNAPSHOT_NAME}-"
+BASELINE_TAG = "fss-backup-baseline"
+
 # File system temporary Mount Point
 TEMP_MOUNT = "/mnt/temp-backup"
 
@@ -31,6 +56,15 @@ THRESHOLD_GB = sys.maxsize
 # Number of cores (like nproc)
 CORE_COUNT = multiprocessing.cpu_count()
 
+# rclone stats lines - "Transferred:  1.234 GiB / 1.234 GiB, 100%, ..." and "Transferred:  12 / 12, 100%"
+RCLONE_BYTES = re.compile(r"Transferred:\s+([\d.]+)\s*([kKMGTPE]?)(?:i?B|Bytes)?\s*/\s*[\d.]+\s*[kKMGTPE]?(?:i?B|Bytes)")
+RCLONE_FILES = re.compile(r"Transferred:\s+(\d+)\s*/\s*\d+,")
+UNIT_MULTIPLIER = {"": 1, "k": 1024, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4, "P": 1024**5, "E": 1024**6}
+
+# Daemon status endpoint (local only)
+STATUS_HOST = "127.0.0.1"
+STATUS_PORT = 8765
+
 ########### SUB ROUTINES ############################
 def extract_bytes(file_system):
     """Pull out file system byte count"""
@@ -41,23 +75,7 @@ def extract_bytes(file_system):
     except KeyError:
         return 0
 
-
-def cleanup_file_snapshot(fs_client, fs_ocid):
-    """Use API to attempt bucket creation"""
-    
-    # Use API to attempt bucket creation
-    snapshots = fs_client.list_snapshots(file_system_id=fs_ocid)
-    for snap in snapshots.data:
-        if snap.name == SNAPSHOT_NAME:
-            if verbose:
-                print(f"Deleting old Snapshot {SNAPSHOT_NAME} with OCID: {snap.id}")
-            file_storage_client.delete_snapshot(snapshot_id=snap.id)
-            if verbose:
-                print(f"Sleeping 5sec to allow deletion to complete")
-            time.sleep(5)
-            return
-
-def cleanup_temporary_mount():
+def cleanup_temporary_mount(verbose=False):
     """Quietly ensures we have a clean mount point"""
     try:
         if verbose:
@@ -66,7 +84,7 @@ def cleanup_temporary_mount():
     except:
         if verbose:
             print(f"OS: umount failed but this is ok", flush=True)
-        
+
 def ensure_temporary_mount():
     """If mount doesn't exist"""
     if not os.path.isdir(TEMP_MOUNT):
@@ -76,320 +94,687 @@ def ensure_temporary_mount():
         except:
             # Raise because if we cannot, we should kill the script immediately
             raise
-      
-def ensure_backup_bucket(oss_client, bucket):
-    """Check bucket status - create if necessary"""
-    try:
-        object_storage_client.get_bucket(namespace_name=namespace_name,bucket_name=bucket)
-        if verbose:
-            print(f"Bucket {bucket} found", flush=True)
-    except oci.exceptions.ServiceError:
-        if verbose:
-            print(f"Bucket {bucket} not found - creating", flush=True)
-        if not dry_run:
-            oss_client.create_bucket(namespace_name=namespace_name,
-                                                create_bucket_details = oci.object_storage.models.CreateBucketDetails(
-                                                    name=bucket,
-                                                    compartment_id=oss_compartment_ocid,
-                                                    storage_tier="Standard",
-                                                    object_events_enabled=True,
-                                                    versioning="Enabled")
-                                                )
-        else:
-            print(f"Dry Run: Would have created bucket {bucket} in compartment {oss_compartment_ocid}", flush=True)                                    
-
-def get_suitable_export(file_storage_client, virtual_network_client, mt_ocid, fs_ocid):
-    """Grab the list of exports from MT and iterate. Pick one with the right mount IP and return it"""
-
-    mount_target = file_storage_client.get_mount_target(mount_target_id=mt_ocid)
-    mount_ip = virtual_network_client.get_private_ip(private_ip_id=mount_target.data.private_ip_ids[0])
-    if verbose:
-        print(f"MT IP: {mount_ip.data.ip_address} ID {mount_target.data.id}",flush=True)
-  
-    # Iterate And grab first suitable export
-    exports = file_storage_client.list_exports(export_set_id=mount_target.data.export_set_id)
-    for export in exports.data:
-        if export.file_system_id == fs_ocid:
-            if verbose:
-                print(f"MT {mount_ip.data.ip_address} Found {export.id} with path {export.path}",flush=True)
-            return f"{mount_ip.data.ip_address}:{export.path}"
-    # Nothing suitable
-    raise ValueError("Cannot find any matching exports")
-
-########### MAIN ROUTINE ###########################
-# Main routine
-
-# Parse Arguments
-parser = argparse.ArgumentParser()
-parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
-parser.add_argument("-fs", "--fssocid", help="FSS Compartment OCID of doing a single FS")
-parser.add_argument("-fc", "--fsscompartment", help="FSS Compartment OCID", required=True)
-parser.add_argument("-oc", "--osscompartment", help="OSS Backup Comaprtment OCID", required=True)
-parser.add_argument("-r", "--remote", help="Named rclone remote for that user.  ie oci:",
-    required=True)
-parser.add_argument("-ad", "--availabilitydomain",
-    help="AD for FSS usage.  Such as dDzb:US-ASHBURN-AD-1",
-    required=True)
-parser.add_argument("-m", "--mountocid", help="Mount Point OCID to use.", required=True)
-parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
-parser.add_argument("-ty", "--type", type=str, help="Type: daily(def), weekly, monthly",
-    default="daily")
-parser.add_argument("--dryrun", help="Dry Run - print what it would do", action="store_true")
-parser.add_argument("-ssc","--serversidecopy",
-    help="For weekly/monthly only - copies directly from latest daily backup, not source FSS",
-    action="store_true")
-parser.add_argument("-s","--sortbytes", 
-    help="Sort by byte size of FSS, smallest to largest (smaller FS backed up first",
-    action="store_true")
-parser.add_argument("-t","--threshold", help="GB threshold - do not back up share if more than this", type=int)
-args = parser.parse_args()
-
-# Process arguments
-verbose = args.verbose
-dry_run = args.dryrun
-server_side_copy = args.serversidecopy
-sort_bytes = args.sortbytes
-
-# Default(None) or named
-profile = args.profile
-
-# FSS Compartment OCID
-fss_compartment_ocid = args.fsscompartment if args.fsscompartment else None
-
-# FSS Single OCID
-fss_ocid = args.fssocid if args.fssocid else None
-
-# OSS Compartment OCID
-oss_compartment_ocid = args.osscompartment if args.osscompartment else None
-
-# Mount IP
-mt_ocid = args.mountocid
-
-# RCLONE Remote
-rclone_remote = args.remote
-
-# Type (daily, weekly, monthly)
-backup_type = args.type
-
-# Availability Domain
-fss_avail_domain = args.availabilitydomain
-
-# FSS Threshold
-threshold_gb = args.threshold if args.threshold else THRESHOLD_GB
-
-# Define OSS client and Namespace
-if profile:
-    config = oci.config.from_file(profile_name=profile)
-else:
-    config = oci.config.from_file()
-
-
-########## STARTUP ######################
-
-object_storage_client = oci.object_storage.ObjectStorageClient(config)
-file_storage_client = oci.file_storage.FileStorageClient(config)
-virtual_network_client = oci.core.VirtualNetworkClient(config)
-namespace_name = object_storage_client.get_namespace().data
-
-# Try to see if mount is there and clean - die if not (raise unchecked)
-
-# If we can't have the mount, die
-try:
-    ensure_temporary_mount()
-except FileExistsError as exc:
-    print(f"FATAL: No way to use mount point {TEMP_MOUNT}: {exc}")
-    exit(1)
-
-# Now clean it up if it is mounted
-cleanup_temporary_mount()
-
-# Explain what we are doing
-if backup_type in ['weekly','monthly']:
-    print(f'Performing Daily Incremental Backup AND {backup_type} using {"Server-Side Copy" if server_side_copy else "Rclone Copy"} method', flush=True)
-else:
-    print('Performing Daily Incremental Backup', flush=True)
-
-# Print threshold if set
-if threshold_gb < sys.maxsize:
-    # This means it was set to anything
-    print(f"GB Threshold set to {threshold_gb} GB - will skip any FS larger than this", flush=True)
-
-# Set Start timer
-start = time.time()
-
-# Main loop - list File Shares
-
-# For listing, if the fss_ocid is set to a single FS, only do that in the filter
-# Else get all shares
-if fss_ocid:
-    shares = file_storage_client.list_file_systems(compartment_id=fss_compartment_ocid, 
-                                                    id=fss_ocid,
-                                                    availability_domain=fss_avail_domain,
-                                                    lifecycle_state="ACTIVE")
-else:
-    shares = file_storage_client.list_file_systems(compartment_id=fss_compartment_ocid, 
-                                                    availability_domain=fss_avail_domain,
-                                                    lifecycle_state="ACTIVE")
-
-# At this point iterate the list (even if single)
-if verbose:
-    print(f'{f"Using {fss_ocid} in" if fss_ocid else "Iterating filesystems in"} Compartment: \
-        {fss_compartment_ocid}.  Count: {len(shares.data)}', flush=True)
-
-
-# Sort by smallest to largest
-if sort_bytes:
-    print("Sorting FSS List smallest to largest", flush=True)
-    shares.data.sort(key=extract_bytes)
-
-for share in shares.data:
-    print(f"Share name: {share.display_name} Size: {round(share.metered_bytes/(1024*1024*1024), 2)} GB", flush=True)
-    backup_bucket_name = share.display_name.strip("/") + "_backup"
-    
-    if (share.metered_bytes > (threshold_gb * 1024 * 1024 * 1024)):
-        print(f"File System is {round(share.metered_bytes/(1024*1024*1024), 2)} GB.  Threshold is {threshold_gb} GB.  Skipping", flush=True)
-        continue
 
-    # Ensure that the bucket is there
-    ensure_backup_bucket(oss_client=object_storage_client,bucket=backup_bucket_name)
+def run_rclone(command, stats, progress=None):
+    """
+    Run rclone, echoing its log, and add the transferred bytes/files from its last stats block to stats.
+    progress(bytes, files) is called as stats lines arrive.
+    Raises CalledProcessError on failure, like subprocess.run(check=True)
+    """
+    transferred_bytes = transferred_files = 0
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+    for line in process.stdout:
+        print(line, end="", flush=True)
+        # Stats are cumulative, so the last block wins
+        match = RCLONE_BYTES.search(line)
+        if match:
+            transferred_bytes = int(float(match.group(1)) * UNIT_MULTIPLIER[match.group(2)])
+        else:
+            match = RCLONE_FILES.search(line)
+            if match:
+                transferred_files = int(match.group(1))
+        if match and progress:
+            progress(transferred_bytes, transferred_files)
+    process.wait()
+    stats["bytes"] += transferred_bytes
+    stats["files"] += transferred_files
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return subprocess.CompletedProcess(command, process.returncode)
+
+def scheduled_type(day: datetime.date, weekly_day: int) -> str:
+    """
+    Backup type for a day, as in the documented cron strategy: weekly on the weekly day,
+    monthly instead when it is the last such day of the month, daily otherwise
+    """
+    if day.weekday() != weekly_day:
+        return "daily"
+    if (day + datetime.timedelta(days=7)).month != day.month:
+        return "monthly"
+    return "weekly"
+
+def next_run_time(now: datetime.datetime, at: datetime.time, run_days) -> datetime.datetime:
+    """Next local time at `at` on one of the run days (weekday numbers, Monday is 0)"""
+    candidate = now.replace(hour=at.hour, minute=at.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += datetime.timedelta(days=1)
+    while candidate.weekday() not in run_days:
+        candidate += datetime.timedelta(days=1)
+    return candidate
+
+class FssBackup:
+    """
+    Backs up the FSS shares of a compartment to OSS.  Clients, namespace and the mount target's
+    export index are built once, so a long running process reuses them across runs.
+    Status (current share, progress, last run) is kept in self.status for the daemon endpoint.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.verbose = args.verbose
+        self.dry_run = args.dryrun
+        self.server_side_copy = args.serversidecopy
+        self.incremental = args.incremental
+        self.profile = args.profile
+        self.fss_compartment_ocid = args.fsscompartment
+        self.fss_ocid = args.fssocid
+        self.oss_compartment_ocid = args.osscompartment
+        self.mt_ocid = args.mountocid
+        self.rclone_remote = args.remote
+        self.fss_avail_domain = args.availabilitydomain
+        self.threshold_gb = args.threshold if args.threshold else THRESHOLD_GB
+
+        # Define OSS, FSS and VCN clients and Namespace (shared, lazily imported)
+        self.object_storage_client = oci_clients.object_storage_client(self.profile)
+        self.file_storage_client = oci_clients.file_storage_client(self.profile)
+        self.virtual_network_client = oci_clients.virtual_network_client(self.profile)
+        self.namespace_name = oci_clients.get_namespace(self.profile)
+
+        # File system OCID -> "ip:/export/path" for the mount target, built on first use
+        self.export_index = None
+        # Buckets known to exist
+        self.known_buckets = set()
+        # Per-share results of the current (or last) run
+        self.results = []
+
+        # sqlite connections can only be used by the thread that opened them - one per thread, opened on use
+        self.history_db = args.historydb
+        self.history_local = threading.local()
+
+        self.status_lock = threading.Lock()
+        self.status = {"state": "idle", "backup_type": None, "started": None, "share": None,
+                       "share_index": 0, "share_count": 0, "share_started": None,
+                       "transferred_bytes": 0, "transferred_files": 0, "next_run": None, "last_run": None}
+
+    @property
+    def history(self):
+        """Run history connection for the calling thread"""
+        if getattr(self.history_local, "conn", None) is None:
+            self.history_local.conn = backup_history.open_history(self.history_db)
+        return self.history_local.conn
+
+    def update_status(self, **changes):
+        with self.status_lock:
+            self.status.update(changes)
+
+    def status_snapshot(self) -> dict:
+        with self.status_lock:
+            return json.loads(json.dumps(self.status, default=str))
+
+    def cleanup_file_snapshot(self, fs_ocid, keep=None):
+        """Delete old backup snapshots - the daily one and any retained incremental snapshot other than keep"""
+
+        # Use API to list the share's snapshots
+        snapshots = self.file_storage_client.list_snapshots(file_system_id=fs_ocid)
+        deleted = False
+        for snap in snapshots.data:
+            if snap.lifecycle_state != "ACTIVE":
+                continue
+            if snap.name == SNAPSHOT_NAME or (snap.name.startswith(INCREMENTAL_PREFIX) and snap.name != keep):
+                if self.verbose:
+                    print(f"Deleting old Snapshot {snap.name} with OCID: {snap.id}")
+                self.file_storage_client.delete_snapshot(snapshot_id=snap.id)
+                deleted = True
+        if deleted:
+            if self.verbose:
+                print(f"Sleeping 5sec to allow deletion to complete")
+            time.sleep(5)
 
-    # Try mount and rclone, it not, clean up snapshot
-    try:
-        # Call the helper to get export path and mount
-        # Get export path
+    def retained_snapshot(self, fs_ocid):
+        """Newest snapshot kept by a successful incremental run - None if there is none"""
+        snapshots = self.file_storage_client.list_snapshots(file_system_id=fs_ocid)
+        retained = [snap for snap in snapshots.data
+                    if snap.lifecycle_state == "ACTIVE" and snap.name.startswith(INCREMENTAL_PREFIX)
+                    and (snap.freeform_tags or {}).get(BASELINE_TAG) == "true"]
+        return max(retained, key=lambda snap: snap.name, default=None)
+
+    def incremental_copy(self, baseline_path, snapshot_path, remote_path, share_stats):
+        """
+        Copy only what changed since the retained snapshot, then delete what was removed.
+        Returns False when the trees could not be compared, so the caller does a full sync instead.
+        Raises CalledProcessError if rclone fails
+        """
+        print(f"Comparing {snapshot_path} with retained snapshot {baseline_path}", flush=True)
         try:
-            # Don't need to try here, but just in case, try and raise
-            mount_path = get_suitable_export(file_storage_client, virtual_network_client,
-                                            mt_ocid=mt_ocid, fs_ocid=share.id)
-            if verbose:
-                print(f"Using the following mount path: {mount_path}", flush=True)
-        except ValueError as exc:
-            #print(f"ERROR: No Suitable Mount point: {exc}")
-            raise
+            report = snapshot_diff.diff_trees(baseline_path, snapshot_path, parallelism=CORE_COUNT * 2, verbose=self.verbose)
+        except OSError as exc:
+            print(f"SNAPSHOT DIFF ERROR: {exc}. Falling back to full sync", flush=True)
+            return False
+        print(snapshot_diff.summary_line(report), flush=True)
+
+        with tempfile.TemporaryDirectory(prefix="fss_backup_") as list_dir:
+            if report["changed"]:
+                changed_file = snapshot_diff.write_list(report["changed"], os.path.join(list_dir, "changed.txt"))
+                print(f"Calling rclone with rclone copy --stats 5m -v --metadata --max-backlog 999999 --links --no-traverse \
+                    --files-from-raw {changed_file} --s3-chunk-size=16M --s3-upload-concurrency={CORE_COUNT} --transfers={CORE_COUNT} \
+                    --checkers={CORE_COUNT*3} {snapshot_path} {remote_path}", flush=True)
+                completed = run_rclone(["rclone","copy", f'{"-vv" if self.verbose else "-v"}', "--metadata", "--max-backlog", "999999", "--links",
+                                        "--no-traverse", "--files-from-raw", changed_file,
+                                        "--s3-chunk-size=16M", "--stats", "5m", f"--s3-upload-concurrency={CORE_COUNT}", f"--transfers={CORE_COUNT}",f"--checkers={CORE_COUNT*3}",
+                                        f"{snapshot_path}",f"{remote_path}"], share_stats, self.rclone_progress)
+                print (f"RCLONE output: {completed.stdout}", flush=True)
+            if report["deleted"]:
+                deleted_file = snapshot_diff.write_list(report["deleted"], os.path.join(list_dir, "deleted.txt"))
+                print(f"Calling rclone with rclone delete --stats 5m -v --files-from-raw {deleted_file} --checkers={CORE_COUNT*3} {remote_path}", flush=True)
+                completed = run_rclone(["rclone","delete", f'{"-vv" if self.verbose else "-v"}', "--stats", "5m",
+                                        "--files-from-raw", deleted_file, f"--checkers={CORE_COUNT*3}",
+                                        f"{remote_path}"], share_stats)
+                print (f"RCLONE output: {completed.stdout}", flush=True)
+        return True
 
-        # FSS Snapshot (for clean backup) - only do it is the mount was successful
-        if not dry_run:
-            # Try to delete FSS Snapshot - ok if it fails
-            cleanup_file_snapshot(fs_client=file_storage_client, fs_ocid=share.id)
+    def ensure_backup_bucket(self, bucket):
+        """Check bucket status - create if necessary"""
+        if bucket in self.known_buckets:
+            return
+        try:
+            self.object_storage_client.get_bucket(namespace_name=self.namespace_name,bucket_name=bucket)
+            self.known_buckets.add(bucket)
+            if self.verbose:
+                print(f"Bucket {bucket} found", flush=True)
+        except oci.exceptions.ServiceError:
+            if self.verbose:
+                print(f"Bucket {bucket} not found - creating", flush=True)
+            if not self.dry_run:
+                self.object_storage_client.create_bucket(namespace_name=self.namespace_name,
+                                                    create_bucket_details = oci.object_storage.models.CreateBucketDetails(
+                                                        name=bucket,
+                                                        compartment_id=self.oss_compartment_ocid,
+                                                        storage_tier="Standard",
+                                                        object_events_enabled=True,
+                                                        versioning="Enabled")
+                                                    )
+                self.known_buckets.add(bucket)
+            else:
+                print(f"Dry Run: Would have created bucket {bucket} in compartment {self.oss_compartment_ocid}", flush=True)
+
+    def build_export_index(self):
+        """Grab the list of exports from MT once, keyed by file system"""
+        mount_target = self.file_storage_client.get_mount_target(mount_target_id=self.mt_ocid)
+        mount_ip = self.virtual_network_client.get_private_ip(private_ip_id=mount_target.data.private_ip_ids[0])
+        if self.verbose:
+            print(f"MT IP: {mount_ip.data.ip_address} ID {mount_target.data.id}",flush=True)
+        self.export_index = {}
+        exports = oci.pagination.list_call_get_all_results(self.file_storage_client.list_exports,
+                                                           export_set_id=mount_target.data.export_set_id)
+        for export in exports.data:
+            # Keep the first suitable export per file system
+            self.export_index.setdefault(export.file_system_id, f"{mount_ip.data.ip_address}:{export.path}")
+
+    def get_suitable_export(self, fs_ocid):
+        """Mount path for the file system from the export index - rebuilt once if the share is new"""
+        if self.export_index is None or fs_ocid not in self.export_index:
+            self.build_export_index()
+        if fs_ocid in self.export_index:
+            if self.verbose:
+                print(f"Found export {self.export_index[fs_ocid]} for {fs_ocid}",flush=True)
+            return self.export_index[fs_ocid]
+        # Nothing suitable
+        raise ValueError("Cannot find any matching exports")
+
+    def list_shares(self):
+        """Active shares in the compartment (or just the single one)"""
+        # For listing, if the fss_ocid is set to a single FS, only do that in the filter
+        # Else get all shares
+        if self.fss_ocid:
+            shares = self.file_storage_client.list_file_systems(compartment_id=self.fss_compartment_ocid,
+                                                            id=self.fss_ocid,
+                                                            availability_domain=self.fss_avail_domain,
+                                                            lifecycle_state="ACTIVE")
+        else:
+            shares = oci.pagination.list_call_get_all_results(self.file_storage_client.list_file_systems,
+                                                              compartment_id=self.fss_compartment_ocid,
+                                                              availability_domain=self.fss_avail_domain,
+                                                              lifecycle_state="ACTIVE")
+
+        # At this point iterate the list (even if single)
+        if self.verbose:
+            print(f'{f"Using {self.fss_ocid} in" if self.fss_ocid else "Iterating filesystems in"} Compartment: \
+                {self.fss_compartment_ocid}.  Count: {len(shares.data)}', flush=True)
+        return shares.data
+
+    def order_shares(self, shares, backup_type):
+        """Apply --sortbytes / --sortduration.  Returns (shares, predictions or None)"""
+        # Sort by smallest to largest
+        if self.args.sortbytes:
+            print("Sorting FSS List smallest to largest", flush=True)
+            shares = sorted(shares, key=extract_bytes)
+
+        # Predicted durations from the run history
+        predictions = None
+        if self.args.sortduration or self.args.estimate:
+            try:
+                rate = backup_history.seconds_per_byte(self.history, backup_type)
+                predictions = {share.id: backup_history.predict_duration(self.history, share.id, backup_type, share.metered_bytes, rate)
+                               for share in shares}
+            except sqlite3.Error as exc:
+                # No history is no reason not to back up - every share is treated as unknown
+                print(f"WARNING: Run history {self.history_db} unavailable, no predictions: {exc}", flush=True)
+                predictions = {share.id: None for share in shares}
+            if self.args.sortduration:
+                print(f"Sorting FSS List by predicted duration, {self.args.sortduration} first", flush=True)
+                shares = backup_history.order_by_duration(shares, predictions, longest_first=self.args.sortduration == "longest")
+        return shares, predictions
+
+    def estimate(self, shares, predictions):
+        """Print predicted duration per share and total (shares over the threshold are skipped anyway)"""
+        eligible = [share for share in shares if share.metered_bytes <= self.threshold_gb * GB]
+        for share in eligible:
+            print(f"Estimate: {share.display_name:<30} {round(share.metered_bytes/GB, 2):>10} GB "
+                  f"{backup_history.format_duration(predictions[share.id]):>12}", flush=True)
+        unknown = len([share for share in eligible if predictions[share.id] is None])
+        total = sum(predictions[share.id] or 0 for share in eligible)
+        print(f"Estimate: {len(eligible)} shares, serial total {backup_history.format_duration(total)}"
+              f"{f' plus {unknown} shares with no history' if unknown else ''}", flush=True)
+        if self.args.lanes > 1:
+            for lane, (seconds, lane_shares) in enumerate(backup_history.pack_lanes(eligible, predictions, self.args.lanes)):
+                print(f"Estimate: lane {lane + 1} {backup_history.format_duration(seconds):>12} | "
+                      f"{' '.join(share.display_name for share in lane_shares)}", flush=True)
+
+    def rclone_progress(self, transferred_bytes, transferred_files):
+        self.update_status(transferred_bytes=transferred_bytes, transferred_files=transferred_files)
+
+    def verify_share(self, share, backup_bucket_name, snapshot_path, rclone_ok):
+        """Verify the snapshot against what is now in the bucket - record, never stop the run"""
+        print(f"Verifying {snapshot_path} against {backup_bucket_name}/{SNAPSHOT_NAME}/ "
+              f"(MD5 {self.args.verifypercent}% of files{f', at most {self.args.verifybudget} GB' if self.args.verifybudget else ''})", flush=True)
+        try:
+            report = fss_verify.verify_tree(self.object_storage_client, self.namespace_name, backup_bucket_name,
+                                            snapshot_path, f"{SNAPSHOT_NAME}/",
+                                            percent=self.args.verifypercent, budget_gb=self.args.verifybudget,
+                                            parallelism=CORE_COUNT * 2, verbose=self.verbose)
+            report["share"] = share.display_name
+            report["rclone_ok"] = rclone_ok
+            print(fss_verify.summary_line(report), flush=True)
+            print(f"Verification report: {fss_verify.write_report(report, self.args.reportdir, backup_bucket_name)}", flush=True)
+            return report["ok"]
+        except (oci.exceptions.ServiceError, OSError) as exc:
+            print(f"VERIFY ERROR: {exc}. Continue processing", flush=True)
+            return False
+
+    def backup_share(self, share, backup_type) -> dict:
+        """Snapshot, mount, rclone and clean up one share.  Returns the result recorded in the history"""
+        verbose = self.verbose
+        dry_run = self.dry_run
+        server_side_copy = self.server_side_copy
+        rclone_remote = self.rclone_remote
+        backup_bucket_name = share.display_name.strip("/") + "_backup"
+
+        # Ensure that the bucket is there
+        self.ensure_backup_bucket(bucket=backup_bucket_name)
+
+        # Timing and rclone totals for the run history
+        share_started = datetime.datetime.now(datetime.timezone.utc)
+        share_start = time.time()
+        share_stats = {"bytes": 0, "files": 0}
+        share_ok = False
+        rclone_ok = True
+        verify_ok = None
+
+        # Incremental runs keep a timestamped snapshot for the next run to compare against
+        snapshot_name = f"{INCREMENTAL_PREFIX}{share_started.strftime('%Y-%m-%d_%H-%M-%S')}" if self.incremental else SNAPSHOT_NAME
+        snapshot_path = f"{TEMP_MOUNT}/.snapshot/{snapshot_name}"
+        baseline = None
+
+        # Try mount and rclone, it not, clean up snapshot
+        try:
+            # Call the helper to get export path and mount
+            # Get export path
+            try:
+                # Don't need to try here, but just in case, try and raise
+                mount_path = self.get_suitable_export(fs_ocid=share.id)
+                if verbose:
+                    print(f"Using the following mount path: {mount_path}", flush=True)
+            except ValueError as exc:
+                #print(f"ERROR: No Suitable Mount point: {exc}")
+                raise
+
+            # FSS Snapshot (for clean backup) - only do it is the mount was successful
+            if not dry_run:
+                # Previous snapshot to compare against, if the last incremental run succeeded
+                if self.incremental:
+                    baseline = self.retained_snapshot(fs_ocid=share.id)
+                    print(f"{f'Retained Snapshot: {baseline.name}' if baseline else 'No retained Snapshot - full sync'}", flush=True)
+
+                # Try to delete FSS Snapshot - ok if it fails.  A full run also drops the retained snapshot
+                self.cleanup_file_snapshot(fs_ocid=share.id, keep=baseline.name if baseline else None)
+
+                if verbose:
+                    print(f"Creating FSS Snapshot: {snapshot_name} via API")
+                snapstart = time.time()
+                snapshot = self.file_storage_client.create_snapshot(create_snapshot_details=oci.file_storage.models.CreateSnapshotDetails(
+                                                    file_system_id=share.id,
+                                                    name=snapshot_name)
+                                                )
+                snapend = time.time()
+                if verbose:
+                    print(f"FSS Snapshot time(ms): {(snapend - snapstart):.2f}s OCID: {snapshot.data.id}", flush=True)
+            else:
+                print(f"Dry Run: Create FSS Snapshot {snapshot_name} via API", flush=True)
+
+            # Now call out to OS to mount RO
+            if not dry_run:
+                if verbose:
+                    print(f"OS: mount -r {mount_path} {TEMP_MOUNT}", flush=True)
+                subprocess.run(["mount","-r",f"{mount_path}",f"{TEMP_MOUNT}"],shell=False, check=True)
+            else:
+                print(f"Dry Run: mount -r {mount_path} {TEMP_MOUNT}")
+
+            # Define remote path on OSS
+            remote_path = f"{rclone_remote}{backup_bucket_name}/{SNAPSHOT_NAME}"
+            additional_copy_name = f"FSS-{backup_type}Backup-{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+            additional_remote_path = f"{rclone_remote}{backup_bucket_name}/{additional_copy_name}"
 
             if verbose:
-                print(f"Creating FSS Snapshot: {SNAPSHOT_NAME} via API")
-            snapstart = time.time()
-            snapshot = file_storage_client.create_snapshot(create_snapshot_details=oci.file_storage.models.CreateSnapshotDetails(
-                                                file_system_id=share.id,
-                                                name=SNAPSHOT_NAME)
-                                            )
-            snapend = time.time()
+                print(f"Using Remote Path (rclone_remote:bucket/snapshot): {rclone_remote}{backup_bucket_name}/{SNAPSHOT_NAME}", flush=True)
+
+            # Call out to rclone it
+            # Additional flags to consider
+            # --s3-disable-checksum  only for large objects, avoid md5sum which is slow
+            # --checkers = Core Count * 2
+            if not dry_run:
+                # Try / catch so as to not kill the process
+                try:
+                    if not (baseline and self.incremental_copy(f"{TEMP_MOUNT}/.snapshot/{baseline.name}", snapshot_path, remote_path, share_stats)):
+                        print(f"Calling rclone with rclone sync --stats 5m -v --metadata --max-backlog 999999 --links \
+                            --s3-chunk-size=16M --s3-upload-concurrency={CORE_COUNT} --transfers={CORE_COUNT} \
+                            --checkers={CORE_COUNT*2} {snapshot_path} {remote_path}", flush=True)
+                        completed = run_rclone(["rclone","sync", f'{"-vv" if verbose else "-v"}', "--metadata", "--max-backlog", "999999", "--links",
+                                                    "--s3-chunk-size=16M", "--stats", "5m", f"--s3-upload-concurrency={CORE_COUNT}", f"--transfers={CORE_COUNT}",f"--checkers={CORE_COUNT*3}",
+                                                    f"{snapshot_path}",f"{remote_path}"], share_stats, self.rclone_progress)
+                        print (f"RCLONE output: {completed.stdout}", flush=True)
+                except subprocess.CalledProcessError:
+                    rclone_ok = False
+                    print("RCLONE ERROR: Continue processing", flush=True)
+
+                # Verify the snapshot against what is now in the bucket - record, never stop the run
+                if self.args.verify:
+                    verify_ok = self.verify_share(share, backup_bucket_name, snapshot_path, rclone_ok)
+
+                # Additional Backup if weekly or monthly selected.  Options are Direct Copy or Server Side Copy
+                if backup_type in ['weekly','monthly']:
+                    if server_side_copy:
+                        print(f'Creating additional {backup_type} backup called {additional_copy_name}. Implemented as rclone server side copy')
+                        print(f"Calling rclone with rclone copy --stats 5m -v --no-check-dest--transfers={CORE_COUNT*2} --checkers={CORE_COUNT*2} {remote_path} {additional_remote_path}", flush=True)
+                        # Try / catch so as to not kill the process
+                        try:
+                            # 2x transfers since server-side
+                            # Also, since integrity check, don't check dest
+                            completed = run_rclone(["rclone","copy", "--stats", "5m", f'{"-vv" if verbose else "-v"}', "--no-check-dest", f"--transfers={CORE_COUNT*2}",f"--checkers={CORE_COUNT*3}",
+                                                        f"{remote_path}", f"{additional_remote_path}"], share_stats, self.rclone_progress)
+                            print (f"RCLONE output: {completed.stdout}")
+                        except subprocess.CalledProcessError:
+                            rclone_ok = False
+                            print("RCLONE ERROR: Continue processing")
+                    else:
+                        # Direct Copy
+                        print(f'Creating additional {backup_type} backup called {additional_copy_name}. Implemented \
+                            as rclone Direct Copy from FSS (full)')
+                        print(f"Calling rclone with rclone sync --stats 5m -v --metadata --max-backlog 999999 --links \
+                            --s3-chunk-size=16M --s3-upload-concurrency={CORE_COUNT} --transfers={CORE_COUNT} \
+                                --checkers={CORE_COUNT*2} {snapshot_path} {additional_remote_path}", flush=True)
+
+                        # Try / catch so as to not kill the process
+                        try:
+                            # Still do integrity check (md5sum)
+                            completed = run_rclone(["rclone","copy", "--stats", "5m", f'{"-vv" if verbose else "-v"}', "--metadata", "--max-backlog", "999999", "--links",
+                                                        "--s3-chunk-size=16M", f"--s3-upload-concurrency={CORE_COUNT}", f"--transfers={CORE_COUNT}",f"--checkers={CORE_COUNT*3}",
+                                                        f"{snapshot_path}",f"{additional_remote_path}"], share_stats, self.rclone_progress)
+                            print (f"RCLONE output: {completed.stdout}")
+                        except subprocess.CalledProcessError:
+                            rclone_ok = False
+                            print("RCLONE ERROR: Continue processing")
+
+            else:
+                if backup_type in ['weekly','monthly']:
+                    if server_side_copy:
+                        print(f"Dry Run: rclone copy -v {remote_path} {additional_remote_path}", flush=True)
+                    else:
+                        print(f"Dry Run: rclone sync --progress --metadata --max-backlog 999999 --links \
+                            --transfers={CORE_COUNT} --checkers={CORE_COUNT*2} {snapshot_path} {remote_path}")
+
+            # Unmount File System (Cleanup)
+            if not dry_run:
+                if verbose:
+                    print(f"OS: umount {TEMP_MOUNT}", flush=True)
+                subprocess.run(["umount",f"{TEMP_MOUNT}"],shell=False, check=True)
+            else:
+                print(f"Dry Run: umount {TEMP_MOUNT}", flush=True)
+
+            # Incremental - keep the new snapshot for the next run if the bucket now matches it, and drop the old one
+            if not dry_run and self.incremental and rclone_ok:
+                if verbose:
+                    print(f"Retaining Snapshot {snapshot.data.name} OCID:{snapshot.data.id}", flush=True)
+                try:
+                    self.file_storage_client.update_snapshot(snapshot_id=snapshot.data.id,
+                                                            update_snapshot_details=oci.file_storage.models.UpdateSnapshotDetails(
+                                                                freeform_tags={BASELINE_TAG: "true"}))
+                    if baseline:
+                        self.file_storage_client.delete_snapshot(snapshot_id=baseline.id)
+                except oci.exceptions.ServiceError as exc:
+                    print(f"Retaining FSS Snapshot failed - the next run removes it: {exc}", flush=True)
+            # Delete Snapshot - no need to keep at this point
+            elif not dry_run:
+                if verbose:
+                    print(f"Deleting Snapshot from FSS. Name: {snapshot.data.name} OCID:{snapshot.data.id}", flush=True)
+                try:
+                    self.file_storage_client.delete_snapshot(snapshot_id=snapshot.data.id)
+                except:
+                    print(f"Deletion of FSS Snapshot failed.  Please record OCID: {snapshot.data.id} and delete manually.", flush=True)
+            else:
+                print(f"Dry Run: {'Retain' if self.incremental else 'Delete'} Snapshot from FSS: {snapshot_name}")
+            share_ok = rclone_ok
+
+        except subprocess.CalledProcessError as exc:
+            print("ERROR: RClone or Mount failed. Continue processing to remove snapshot", flush=True)
             if verbose:
-                print(f"FSS Snapshot time(ms): {(snapend - snapstart):.2f}s OCID: {snapshot.data.id}", flush=True)
-        else:
-            print(f"Dry Run: Create FSS Snapshot {SNAPSHOT_NAME} via API", flush=True)
-
-        # Now call out to OS to mount RO
-        if not dry_run:
+                print(exc)
+        except ValueError as exc:
+            print("ERROR: No Export. Continue processing to remove snapshot", flush=True)
             if verbose:
-                print(f"OS: mount -r {mount_path} {TEMP_MOUNT}", flush=True)
-            subprocess.run(["mount","-r",f"{mount_path}",f"{TEMP_MOUNT}"],shell=False, check=True)
-        else:
-            print(f"Dry Run: mount -r {mount_path} {TEMP_MOUNT}")
-
-        # Define remote path on OSS
-        remote_path = f"{rclone_remote}{backup_bucket_name}/{SNAPSHOT_NAME}"
-        additional_copy_name = f"FSS-{backup_type}Backup-{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
-        additional_remote_path = f"{rclone_remote}{backup_bucket_name}/{additional_copy_name}"
-        
-        if verbose:
-            print(f"Using Remote Path (rclone_remote:bucket/snapshot): {rclone_remote}{backup_bucket_name}/{SNAPSHOT_NAME}", flush=True)
-
-        # Call out to rclone it
-        # Additional flags to consider
-        # --s3-disable-checksum  only for large objects, avoid md5sum which is slow
-        # --checkers = Core Count * 2
-        if not dry_run:
-            print(f"Calling rclone with rclone sync --stats 5m -v --metadata --max-backlog 999999 --links \
-                --s3-chunk-size=16M --s3-upload-concurrency={CORE_COUNT} --transfers={CORE_COUNT} \
-                --checkers={CORE_COUNT*2} /mnt/temp-backup/.snapshot/{SNAPSHOT_NAME} {remote_path}", flush=True)
-            
-            # Try / catch so as to not kill the process
-            try:
-                completed = subprocess.run(["rclone","sync", f'{"-vv" if verbose else "-v"}', "--metadata", "--max-backlog", "999999", "--links",  
-                                            "--s3-chunk-size=16M", "--stats", "5m", f"--s3-upload-concurrency={CORE_COUNT}", f"--transfers={CORE_COUNT}",f"--checkers={CORE_COUNT*3}",
-                                            f"/mnt/temp-backup/.snapshot/{SNAPSHOT_NAME}",f"{remote_path}"],shell=False, check=True)
-                print (f"RCLONE output: {completed.stdout}", flush=True)
-            except subprocess.CalledProcessError:
-                print("RCLONE ERROR: Continue processing", flush=True)
-
-            # Additional Backup if weekly or monthly selected.  Options are Direct Copy or Server Side Copy
-            if backup_type in ['weekly','monthly']:
-                if server_side_copy:
-                    print(f'Creating additional {backup_type} backup called {additional_copy_name}. Implemented as rclone server side copy')
-                    print(f"Calling rclone with rclone copy --stats 5m -v --no-check-dest--transfers={CORE_COUNT*2} --checkers={CORE_COUNT*2} {remote_path} {additional_remote_path}", flush=True)
-                    # Try / catch so as to not kill the process
-                    try:
-                        # 2x transfers since server-side
-                        # Also, since integrity check, don't check dest
-                        completed = subprocess.run(["rclone","copy", "--stats", "5m", f'{"-vv" if verbose else "-v"}', "--no-check-dest", f"--transfers={CORE_COUNT*2}",f"--checkers={CORE_COUNT*3}",
-                                                    f"{remote_path}", f"{additional_remote_path}"],shell=False, check=True)
-                        print (f"RCLONE output: {completed.stdout}")
-                    except subprocess.CalledProcessError:
-                        print("RCLONE ERROR: Continue processing")
-                else:
-                    # Direct Copy
-                    print(f'Creating additional {backup_type} backup called {additional_copy_name}. Implemented \
-                        as rclone Direct Copy from FSS (full)')
-                    print(f"Calling rclone with rclone sync --stats 5m -v --metadata --max-backlog 999999 --links \
-                        --s3-chunk-size=16M --s3-upload-concurrency={CORE_COUNT} --transfers={CORE_COUNT} \
-                            --checkers={CORE_COUNT*2} /mnt/temp-backup/.snapshot/{SNAPSHOT_NAME} {additional_remote_path}", flush=True)
-                    
-                    # Try / catch so as to not kill the process
-                    try:
-                        # Still do integrity check (md5sum)
-                        completed = subprocess.run(["rclone","copy", "--stats", "5m", f'{"-vv" if verbose else "-v"}', "--metadata", "--max-backlog", "999999", "--links",  
-                                                    "--s3-chunk-size=16M", f"--s3-upload-concurrency={CORE_COUNT}", f"--transfers={CORE_COUNT}",f"--checkers={CORE_COUNT*3}",
-                                                    f"/mnt/temp-backup/.snapshot/{SNAPSHOT_NAME}",f"{additional_remote_path}"],shell=False, check=True)
-                        print (f"RCLONE output: {completed.stdout}")
-                    except subprocess.CalledProcessError:
-                        print("RCLONE ERROR: Continue processing")
-
-        else:
-            if type in ['weekly','monthly']:
-                if server_side_copy:
-                    print(f"Dry Run: rclone copy -v {remote_path} {additional_remote_path}", flush=True)
-                else:
-                    print(f"Dry Run: rclone sync --progress --metadata --max-backlog 999999 --links \
-                        --transfers={CORE_COUNT} --checkers={CORE_COUNT*2} /mnt/temp-backup/.snapshot/{SNAPSHOT_NAME} {remote_path}")
-
-        # Unmount File System (Cleanup)
-        if not dry_run:
+                print(exc)
+        except (oci.exceptions.RequestException, oci.exceptions.ServiceError) as exc:
+            print("ERROR: API Failed. Continue processing to remove snapshot", flush=True)
             if verbose:
-                print(f"OS: umount {TEMP_MOUNT}", flush=True)
-            subprocess.run(["umount",f"{TEMP_MOUNT}"],shell=False, check=True)
-        else:
-            print(f"Dry Run: umount {TEMP_MOUNT}", flush=True)
-
-        # Delete Snapshot - no need to keep at this point
+                print(exc)
+            # The share may still be mounted - the next share needs the mount point
+            if not dry_run:
+                cleanup_temporary_mount(verbose)
+
+        share_duration = time.time() - share_start
+        result = {"share": share.display_name, "share_id": share.id, "backup_type": backup_type,
+                  "started": share_started.isoformat(), "duration": round(share_duration, 2),
+                  "bytes_transferred": share_stats["bytes"], "files_transferred": share_stats["files"],
+                  "ok": share_ok, "verify_ok": verify_ok}
+
+        # Record the run so the next schedule can use it
         if not dry_run:
-            if verbose:
-                print(f"Deleting Snapshot from FSS. Name: {snapshot.data.name} OCID:{snapshot.data.id}", flush=True)
             try:
-                file_storage_client.delete_snapshot(snapshot_id=snapshot.data.id)
-            except:
-                print(f"Deletion of FSS Snapshot failed.  Please record OCID: {snapshot.data.id} and delete manually.", flush=True)    
+                backup_history.record_run(self.history, share.id, share.display_name, backup_type, share_started, share_duration,
+                                          share.metered_bytes, share_stats["bytes"], share_stats["files"], share_ok)
+            except sqlite3.Error as exc:
+                # A read-only or locked database must not stop the remaining shares
+                print(f"WARNING: Could not record the run of {share.display_name} in {self.history_db}: {exc}", flush=True)
+            print(f"Share {share.display_name} took {backup_history.format_duration(share_duration)} | "
+                  f"Transferred: {share_stats['bytes']/GB:.2f} GB, {share_stats['files']} files", flush=True)
+        return result
+
+    def run(self, backup_type) -> list:
+        """One backup run over all shares - returns the per-share results"""
+        # Explain what we are doing
+        if backup_type in ['weekly','monthly']:
+            print(f'Performing Daily Incremental Backup AND {backup_type} using {"Server-Side Copy" if self.server_side_copy else "Rclone Copy"} method', flush=True)
         else:
-            print(f"Dry Run: Delete Snapshot from FSS: {SNAPSHOT_NAME}")
-
+            print('Performing Daily Incremental Backup', flush=True)
+
+        # Print threshold if set
+        if self.threshold_gb < sys.maxsize:
+            # This means it was set to anything
+            print(f"GB Threshold set to {self.threshold_gb} GB - will skip any FS larger than this", flush=True)
+
+        # Set Start timer
+        start = time.time()
+        run_started = datetime.datetime.now(datetime.timezone.utc)
+
+        # Main loop - list File Shares
+        shares, _ = self.order_shares(self.list_shares(), backup_type)
+        self.update_status(state="running", backup_type=backup_type, started=run_started.isoformat(),
+                           share_count=len(shares), share_index=0)
+
+        # Kept on the instance so a failed run still reports the shares it finished
+        self.results = results = []
+        for index, share in enumerate(shares):
+            print(f"Share name: {share.display_name} Size: {round(share.metered_bytes/GB, 2)} GB", flush=True)
+
+            if (share.metered_bytes > (self.threshold_gb * GB)):
+                print(f"File System is {round(share.metered_bytes/GB, 2)} GB.  Threshold is {self.threshold_gb} GB.  Skipping", flush=True)
+                continue
+
+            self.update_status(share=share.display_name, share_index=index + 1, share_started=time.time(),
+                               transferred_bytes=0, transferred_files=0)
+            results.append(self.backup_share(share, backup_type))
+
+        end = time.time()
+        self.update_status(state="idle", share=None, share_started=None,
+                           last_run={"backup_type": backup_type, "started": run_started.isoformat(),
+                                     "duration": round(end - start, 2), "shares": results})
+        print(f"Finished | Time taken: {(end - start):.2f}s",flush=True)
+        return results
+
+########### DAEMON ###########################
+class StatusHandler(BaseHTTPRequestHandler):
+    """GET /status - JSON status of the daemon"""
+    backup = None
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ["", "/status"]:
+            self.send_error(404)
+            return
+        status = self.backup.status_snapshot()
+        if status["share_started"]:
+            status["share_elapsed"] = round(time.time() - status["share_started"], 1)
+        body = json.dumps(status, indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the backup log clean
+        return
+
+def run_daemon(backup, args):
+    """Stay up, run the schedule internally and serve the status endpoint until SIGTERM/SIGINT"""
+    stop = threading.Event()
+    for sig in [signal.SIGTERM, signal.SIGINT]:
+        signal.signal(sig, lambda signum, frame: stop.set())
+
+    StatusHandler.backup = backup
+    server = ThreadingHTTPServer((STATUS_HOST, args.statusport), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Daemon: status on http://{STATUS_HOST}:{args.statusport}/status", flush=True)
+
+    run_at = datetime.datetime.strptime(args.runat, "%H:%M").time()
+    run_days = [int(day) for day in args.rundays.split(",")]
+    while not stop.is_set():
+        next_run = next_run_time(datetime.datetime.now(), run_at, run_days)
+        # An explicit --type overrides the schedule (eg a daemon doing dailies only)
+        backup_type = args.type if args.type else scheduled_type(next_run.date(), args.weeklyday)
+        backup.update_status(next_run=f"{next_run.isoformat()} ({backup_type})")
+        print(f"Daemon: next run {next_run} ({backup_type})", flush=True)
+        if stop.wait((next_run - datetime.datetime.now()).total_seconds()):
+            break
+        cleanup_temporary_mount(backup.verbose)
+        run_started = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            backup.run(backup_type)
+        except Exception as exc:
+            # Keep the schedule going - record the failure for the status endpoint and leave the mount clean
+            error = f"{type(exc).__name__}: {getattr(exc, 'message', exc)}"
+            print(f"Daemon: {backup_type} run failed: {error}", flush=True)
+            if backup.verbose:
+                traceback.print_exc()
+            cleanup_temporary_mount(backup.verbose)
+            backup.update_status(state="idle", share=None, share_started=None,
+                                 last_run={"backup_type": backup_type, "started": run_started.isoformat(),
+                                           "duration": round((datetime.datetime.now(datetime.timezone.utc) - run_started).total_seconds(), 2),
+                                           "error": error, "shares": backup.results})
+    server.shutdown()
+    print("Daemon: stopped", flush=True)
 
-    except subprocess.CalledProcessError as exc:
-        print("ERROR: RClone or Mount failed. Continue processing to remove snapshot", flush=True)
-        if verbose:
-            print(exc)
-    except ValueError as exc:
-        print("ERROR: No Export. Continue processing to remove snapshot", flush=True)
-        if verbose:
-            print(exc)
-    except oci.exceptions.RequestException as exc:
-        print("ERROR: API Failed. Continue processing to remove snapshot", flush=True)
-        if verbose:
-            print(exc)        
-end = time.time()
-print(f"Finished | Time taken: {(end - start):.2f}s",flush=True)
\ No newline at end of file
+########### MAIN ROUTINE ###########################
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-fs", "--fssocid", help="FSS Compartment OCID of doing a single FS")
+    parser.add_argument("-fc", "--fsscompartment", help="FSS Compartment OCID", required=True)
+    parser.add_argument("-oc", "--osscompartment", help="OSS Backup Comaprtment OCID", required=True)
+    parser.add_argument("-r", "--remote", help="Named rclone remote for that user.  ie oci:",
+        required=True)
+    parser.add_argument("-ad", "--availabilitydomain",
+        help="AD for FSS usage.  Such as dDzb:US-ASHBURN-AD-1",
+        required=True)
+    parser.add_argument("-m", "--mountocid", help="Mount Point OCID to use.", required=True)
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    parser.add_argument("-ty", "--type", type=str, help="Type: daily(def), weekly, monthly.  With --daemon, overrides the schedule")
+    parser.add_argument("--dryrun", help="Dry Run - print what it would do", action="store_true")
+    parser.add_argument("-ssc","--serversidecopy",
+        help="For weekly/monthly only - copies directly from latest daily backup, not source FSS",
+        action="store_true")
+    parser.add_argument("-s","--sortbytes",
+        help="Sort by byte size of FSS, smallest to largest (smaller FS backed up first",
+        action="store_true")
+    parser.add_argument("-t","--threshold", help="GB threshold - do not back up share if more than this", type=int)
+    parser.add_argument("--verify", help="After the daily copy, verify the snapshot against the bucket (size and MD5)",
+        action="store_true")
+    parser.add_argument("--verifypercent", help="Percentage of files to MD5 during verify (default all)", type=float, default=100)
+    parser.add_argument("--verifybudget", help="GB to MD5 at most per share during verify", type=float)
+    parser.add_argument("--reportdir", help="Directory for per-share verification reports", default=".")
+    parser.add_argument("-sd","--sortduration", choices=["longest","shortest"],
+        help="Order shares by predicted duration from run history - longest first for parallel runs, shortest first for serial")
+    parser.add_argument("--lanes", help="With --estimate, pack shares into this many parallel lanes (hosts or cron entries)",
+        type=int, default=1)
+    parser.add_argument("--estimate", help="Print predicted duration per share and total runtime, then exit",
+        action="store_true")
+    parser.add_argument("--historydb", help="Run history database", default=backup_history.DEFAULT_DB)
+    parser.add_argument("--incremental",
+        help="Keep the snapshot between runs and copy only files changed since the previous one (daily copy)",
+        action="store_true")
+    parser.add_argument("--daemon", help="Stay running and back up on the internal schedule", action="store_true")
+    parser.add_argument("--runat", help="Daemon: local time to run (HH:MM)", default="18:00")
+    parser.add_argument("--rundays", help="Daemon: weekdays to run, Monday=0 (default Mon-Fri)", default="0,1,2,3,4")
+    parser.add_argument("--weeklyday", help="Daemon: weekday of the weekly backup (monthly on the last one of the month)",
+        type=int, default=4)
+    parser.add_argument("--statusport", help="Daemon: local status endpoint port", type=int, default=STATUS_PORT)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+
+    ########## STARTUP ######################
+    backup = FssBackup(args)
+
+    # Try to see if mount is there and clean - die if not (raise unchecked)
+
+    # If we can't have the mount, die
+    try:
+        ensure_temporary_mount()
+    except FileExistsError as exc:
+        print(f"FATAL: No way to use mount point {TEMP_MOUNT}: {exc}")
+        exit(1)
+
+    # Now clean it up if it is mounted
+    cleanup_temporary_mount(args.verbose)
+
+    if args.daemon:
+        run_daemon(backup, args)
+        return
+
+    backup_type = args.type if args.type else "daily"
+    if args.estimate:
+        shares, predictions = backup.order_shares(backup.list_shares(), backup_type)
+        backup.estimate(shares, predictions)
+        return
+    backup.run(backup_type)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#! /usr/bin/env python3
+
+'''
+Verifies a backed up tree (eg the FSS snapshot) against the objects in the bucket
+
+The local tree and the bucket listing under the prefix (name, size, md5) are compared subtree by subtree, in
+parallel: the top directory levels with delimiter listings, and each subtree below as a merge of the sorted
+local walk and its sorted listing, so the whole listing is never held in memory (tens of millions of objects
+would take GBs).  Every file is checked for presence and size; sampled files are also hashed and
+compared with the object MD5.  Multipart objects carry an MD5 of the part MD5s ("<base64>-<parts>"), which
+is rebuilt by hashing the file with the candidate part sizes (rclone's chunk size, the SDK default part size,
+or the size implied by the part count).
+
+Sampling is deterministic per file name, so repeated runs with the same percentage hash the same files:
+    --percent  hash roughly this percentage of files
+    --budget   stop hashing once this many GB have been read
+
+Used by fss_backup.py (--verify) after each share, and standalone:
+ $> python3 fss_verify.py -b share_backup -px FSS-dailyBackup/ -f /mnt/temp-backup/.snapshot/FSS-dailyBackup --percent 10
+'''
+
+import os
+import json
+import time
+import zlib
+import base64
+import hashlib
+import stat
+import threading
+import argparse
+import concurrent.futures
+
+from backup_common import GB, RCLONE_LINK_SUFFIX, TaskTree
+from bucket_lister import list_range_pages
+
+# Part sizes to try when rebuilding multipart MD5s - rclone --s3-chunk-size=16M and the SDK DEFAULT_PART_SIZE
+PART_SIZES = [16 * 1024 * 1024, 128 * 1024 * 1024]
+
+# Read size while hashing - part sizes are multiples of this, so part boundaries fall between reads
+READ_SIZE = 1024 * 1024
+
+# Mismatches listed per category in the report (counts are always complete)
+MAX_LISTED = 1000
+
+
+def sampled(relative_name, percent):
+    """Deterministic per-name sample"""
+    return percent >= 100 or zlib.crc32(relative_name.encode("utf-8")) % 10000 < percent * 100
+
+def candidate_part_sizes(size, parts):
+    """Part sizes consistent with the object size and part count"""
+    implied = -(-size // parts)
+    implied = -(-implied // READ_SIZE) * READ_SIZE
+    candidates = []
+    for part_size in PART_SIZES + [implied]:
+        if part_size not in candidates and -(-size // part_size) == parts:
+            candidates.append(part_size)
+    return candidates
+
+def file_md5(path, size, expected):
+    """
+    MD5 of the file in the object's form - plain base64, or "<base64 of md5 of part md5s>-<parts>" for multipart.
+    All candidate part sizes are hashed in one pass.
+    """
+    multipart = expected and "-" in expected
+    part_sizes = candidate_part_sizes(size, int(expected.rsplit("-", 1)[1])) if multipart else []
+    whole = hashlib.md5()
+    parts = {part_size: [hashlib.md5(), []] for part_size in part_sizes}
+    offset = 0
+    with open(path, "rb") as in_file:
+        while True:
+            data = in_file.read(READ_SIZE)
+            if not data:
+                break
+            offset += len(data)
+            if not multipart:
+                whole.update(data)
+            for part_size, (current, digests) in parts.items():
+                current.update(data)
+                if offset % part_size == 0:
+                    digests.append(current.digest())
+                    parts[part_size][0] = hashlib.md5()
+    if not multipart:
+        return base64.b64encode(whole.digest()).decode()
+    for part_size, (current, digests) in parts.items():
+        if offset % part_size:
+            digests.append(current.digest())
+        candidate = f"{base64.b64encode(hashlib.md5(b''.join(digests)).digest()).decode()}-{len(digests)}"
+        if candidate == expected:
+            return candidate
+    return f"(no part size matched {len(part_sizes)} candidates)"
+
+def local_entries(directory, relative_dir):
+    """
+    (relative name, path, lstat) for what rclone backs up under the directory, in bucket listing order.
+    A subdirectory sorts as "name/" among its siblings, which is where its objects fall in the listing.
+    """
+    keyed = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            entry_stat = entry.stat(follow_symlinks=False)
+            if stat.S_ISDIR(entry_stat.st_mode):
+                keyed.append((f"{entry.name}/", entry.path, entry_stat))
+            elif stat.S_ISLNK(entry_stat.st_mode):
+                keyed.append((entry.name + RCLONE_LINK_SUFFIX, entry.path, entry_stat))
+            elif stat.S_ISREG(entry_stat.st_mode):
+                keyed.append((entry.name, entry.path, entry_stat))
+            # Sockets, fifos and devices are not backed up
+    keyed.sort(key=lambda item: item[0])
+    for key, path, entry_stat in keyed:
+        if stat.S_ISDIR(entry_stat.st_mode):
+            yield from local_entries(path, f"{relative_dir}{key}")
+        else:
+            yield f"{relative_dir}{key}", path, entry_stat
+
+def bucket_entries(object_storage_client, namespace_name, bucket_name, prefix, relative_dir):
+    """(relative name, size, md5) for every object under prefix + relative_dir, in listing order"""
+    for objects, _ in list_range_pages(object_storage_client, namespace_name, bucket_name, "name,size,md5", False,
+                                       prefix=(prefix + relative_dir) or None):
+        for obj in objects:
+            yield obj.name[len(prefix):], obj.size, obj.md5
+
+def verify_tree(object_storage_client, namespace_name, bucket_name, local_root, prefix,
+                percent=100, budget_gb=None, parallelism=8, depth=2, verbose=False):
+    """
+    Compare the local tree with the bucket - returns the report dict.
+    The top depth directory levels are compared level by level (listing with a delimiter) and their
+    subdirectories handed out in parallel; below that, each subtree is a merge of the sorted local walk
+    with its bucket listing.  Memory stays bounded by directory width, not by the number of objects.
+    """
+    start = time.time()
+    lock = threading.Lock()
+    budget_bytes = budget_gb * GB if budget_gb is not None else None
+    report = {"bucket": bucket_name, "prefix": prefix, "local_root": local_root, "percent": percent, "budget_gb": budget_gb,
+              "objects_listed": 0, "files": 0, "bytes": 0, "hashed": 0, "hashed_bytes": 0,
+              "missing": [], "size_mismatch": [], "md5_mismatch": [], "errors": [], "extra_in_bucket": []}
+    counts = {"missing": 0, "size_mismatch": 0, "md5_mismatch": 0, "errors": 0, "extra_in_bucket": 0}
+
+    def record(category, entry):
+        with lock:
+            counts[category] += 1
+            if len(report[category]) < MAX_LISTED:
+                report[category].append(entry)
+        if verbose:
+            print(f"{os.getpid()} {category}: {entry}", flush=True)
+
+    # Subtrees are compared in parallel; hashing runs in its own pool with a bounded backlog
+    tasks = TaskTree(parallelism)
+    hash_pool = concurrent.futures.ThreadPoolExecutor(max_workers=parallelism)
+    hash_slots = threading.BoundedSemaphore(parallelism * 4)
+
+    def check_md5(path, relative, size, expected):
+        if not expected:
+            # Not in the listing - multipart objects always have this header
+            headers = object_storage_client.head_object(namespace_name=namespace_name, bucket_name=bucket_name,
+                                                        object_name=prefix + relative).headers
+            expected = headers.get("opc-multipart-md5") or headers.get("content-md5")
+            if not expected:
+                return
+        actual = file_md5(path, size, expected)
+        if actual != expected:
+            record("md5_mismatch", {"name": relative, "expected": expected, "actual": actual})
+
+    def hashed(future):
+        hash_slots.release()
+        if future.exception() is not None:
+            record("errors", {"task": "md5", "error": str(future.exception())})
+
+    def compare(relative, path, entry_stat, found):
+        """One local file against its object (found is (size, md5), None when missing)"""
+        if stat.S_ISLNK(entry_stat.st_mode):
+            size = len(os.fsencode(os.readlink(path)))
+        else:
+            size = entry_stat.st_size
+        with lock:
+            report["files"] += 1
+            report["bytes"] += size
+        if found is None:
+            record("missing", {"name": relative, "size": size})
+            return
+        if found[0] != size:
+            record("size_mismatch", {"name": relative, "local": size, "bucket": found[0]})
+            return
+        if not stat.S_ISREG(entry_stat.st_mode) or not sampled(relative, percent):
+            return
+        with lock:
+            if budget_bytes is not None and report["hashed_bytes"] + size > budget_bytes:
+                return
+            report["hashed"] += 1
+            report["hashed_bytes"] += size
+        hash_slots.acquire()
+        hash_pool.submit(check_md5, path, relative, size, found[1]).add_done_callback(hashed)
+
+    def listed(count):
+        with lock:
+            report["objects_listed"] += count
+
+    def merge(relative_dir):
+        """Sorted local walk against the sorted listing of the same subtree"""
+        local_iter = local_entries(os.path.join(local_root, relative_dir), relative_dir)
+        bucket_iter = bucket_entries(object_storage_client, namespace_name, bucket_name, prefix, relative_dir)
+        local = next(local_iter, None)
+        remote = next(bucket_iter, None)
+        while local is not None or remote is not None:
+            if remote is None or (local is not None and local[0] < remote[0]):
+                compare(*local, None)
+                local = next(local_iter, None)
+            elif local is None or remote[0] < local[0]:
+                listed(1)
+                record("extra_in_bucket", remote[0])
+                remote = next(bucket_iter, None)
+            else:
+                listed(1)
+                compare(*local, remote[1:])
+                local = next(local_iter, None)
+                remote = next(bucket_iter, None)
+
+    def extra(relative_dir):
+        """A prefix with no local directory - everything under it only exists in the bucket"""
+        for relative, _, _ in bucket_entries(object_storage_client, namespace_name, bucket_name, prefix, relative_dir):
+            listed(1)
+            record("extra_in_bucket", relative)
+
+    def level(relative_dir, remaining):
+        """One directory level - its files here, its subdirectories as their own tasks"""
+        if remaining == 0:
+            merge(relative_dir)
+            return
+        objects = {}
+        sub_prefixes = set()
+        for page, prefixes in list_range_pages(object_storage_client, namespace_name, bucket_name, "name,size,md5", False,
+                                               prefix=(prefix + relative_dir) or None, delimiter="/"):
+            for obj in page:
+                objects[obj.name[len(prefix):]] = (obj.size, obj.md5)
+            sub_prefixes.update(sub_prefix[len(prefix):] for sub_prefix in prefixes)
+        listed(len(objects))
+        with os.scandir(os.path.join(local_root, relative_dir)) as scan:
+            for entry in scan:
+                entry_stat = entry.stat(follow_symlinks=False)
+                relative = f"{relative_dir}{entry.name}"
+                if stat.S_ISDIR(entry_stat.st_mode):
+                    sub_prefixes.discard(f"{relative}/")
+                    tasks.submit(level, f"{relative}/", remaining - 1)
+                    continue
+                if stat.S_ISLNK(entry_stat.st_mode):
+                    relative += RCLONE_LINK_SUFFIX
+                elif not stat.S_ISREG(entry_stat.st_mode):
+                    continue
+                compare(relative, entry.path, entry_stat, objects.pop(relative, None))
+        # Whatever was not matched by a local file only exists in the bucket
+        for relative in objects:
+            record("extra_in_bucket", relative)
+        for sub_prefix in sub_prefixes:
+            tasks.submit(extra, sub_prefix)
+
+    tasks.submit(level, "", depth)
+    tasks.wait()
+    tasks.shutdown()
+    hash_pool.shutdown()
+    for args, exc in tasks.errors:
+        record("errors", {"task": str(args[0]), "error": str(exc)})
+
+    report["extra_in_bucket"].sort()
+    report["counts"] = counts
+    report["ok"] = not any(counts.values())
+    report["seconds"] = round(time.time() - start, 2)
+    return report
+
+def summary_line(report):
+    counts = report["counts"]
+    return (f"Verify {'OK' if report['ok'] else 'FAILED'} | Files: {report['files']} | Objects: {report['objects_listed']} | "
+            f"Hashed: {report['hashed']} ({report['hashed_bytes'] / GB:.2f} GB) | Missing: {counts['missing']} | "
+            f"Size mismatch: {counts['size_mismatch']} | MD5 mismatch: {counts['md5_mismatch']} | "
+            f"Extra in bucket: {counts['extra_in_bucket']} | Errors: {counts['errors']} | Time taken: {report['seconds']:.2f}s")
+
+def write_report(report, report_dir, name):
+    """Per-share JSON report - returns the file name"""
+    os.makedirs(report_dir, exist_ok=True)
+    report_file = os.path.join(report_dir, f"{name}_verify_{time.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(report_file, "w") as out_file:
+        json.dump(report, out_file, indent=2)
+    return report_file
+
+if __name__ == '__main__':
+    import oci_clients
+
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
+    parser.add_argument("-px", "--prefix", type=str, help="object prefix the tree was copied to (eg FSS-dailyBackup/)", default="")
+    parser.add_argument("-f", "--folder", type=str, help="local tree to verify", required=True)
+    parser.add_argument("-p", "--parallelism", type=int, help="parallel listing and hashing threads", default=8)
+    parser.add_argument("-d", "--depth", type=int, help="directory levels split into parallel subtrees", default=2)
+    parser.add_argument("--percent", type=float, help="percentage of files to hash (default all)", default=100)
+    parser.add_argument("--budget", type=float, help="GB to hash at most")
+    parser.add_argument("-rd", "--reportdir", type=str, help="directory for the JSON report", default=".")
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    args = parser.parse_args()
+
+    # Listing and hashing (head_object) threads
+    oci_clients.set_pool_size(args.parallelism * 2)
+    object_storage_client = oci_clients.object_storage_client(args.profile)
+    namespace_name = oci_clients.get_namespace(args.profile)
+
+    report = verify_tree(object_storage_client, namespace_name, args.bucket, args.folder, args.prefix,
+                         percent=args.percent, budget_gb=args.budget, parallelism=args.parallelism,
+                         depth=args.depth, verbose=args.verbose)
+    print(summary_line(report), flush=True)
+    print(f"Report: {write_report(report, args.reportdir, args.bucket)}", flush=True)
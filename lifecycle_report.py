@@ -0,0 +1,239 @@
+#! /usr/bin/env python3
+
+'''
+Evaluates an Object Lifecycle policy JSON (eg lifecycle_rules_14_60_180.json) against a real bucket
+
+Streams the (versioned) bucket listing once and, in constant memory:
+    - aggregates count and bytes per rule prefix and age bucket, split into current and previous versions
+    - evaluates each enabled rule locally and reports what it would delete, archive or move to
+      Infrequent Access as of a given date (delete beats archive beats infrequent access, as in OSS)
+    - counts the uncommitted multipart uploads an ABORT rule would clean up
+
+ $> python3 lifecycle_report.py -b share_backup -r lifecycle_rules_14_60_180.json --date 2024-01-31
+
+Options:
+ -r/--rules         :   Lifecycle policy JSON (same format as oci os object-lifecycle-policy put --from-json)
+ -d/--date          :   Evaluate as of this date (YYYY-MM-DD).  Defaults to now
+ -pl/--partitioned  :   List with this many concurrent prefix partitions (see bucket_lister.py)
+ -j/--json          :   Also write the full report as JSON to this file
+'''
+
+import os
+import time
+import json
+import fnmatch
+import datetime
+import argparse
+
+from backup_common import GB
+from bucket_lister import classify_versions, list_range_pages, partitioned_pages
+
+# Age buckets (upper bound in days, label)
+AGE_BUCKETS = [(1, "<1d"), (7, "1-7d"), (14, "7-14d"), (30, "14-30d"), (60, "30-60d"),
+               (90, "60-90d"), (180, "90-180d"), (365, "180-365d"), (None, ">365d")]
+
+# When rules overlap the strongest action wins
+ACTION_PRIORITY = {"DELETE": 3, "ARCHIVE": 2, "INFREQUENT_ACCESS": 1}
+
+# Fields needed from the listing
+LIST_FIELDS = "name,size,timeCreated,timeModified"
+
+
+def load_rules(rules_file):
+    """Enabled rules from the policy JSON"""
+    with open(rules_file) as in_file:
+        policy = json.load(in_file)
+    return [rule for rule in policy["items"] if rule.get("is-enabled", True)]
+
+def rule_days(rule):
+    """Rule age threshold in days"""
+    return rule["time-amount"] * (365 if rule["time-unit"] == "YEARS" else 1)
+
+def rule_matches(rule, object_name):
+    """Object name filter - inclusion prefixes/patterns (any), then exclusion patterns"""
+    name_filter = rule.get("object-name-filter") or {}
+    prefixes = name_filter.get("inclusion-prefixes")
+    patterns = name_filter.get("inclusion-patterns")
+    exclusions = name_filter.get("exclusion-patterns")
+    if prefixes and not any(object_name.startswith(prefix) for prefix in prefixes):
+        return False
+    if patterns and not any(fnmatch.fnmatchcase(object_name, pattern) for pattern in patterns):
+        return False
+    if exclusions and any(fnmatch.fnmatchcase(object_name, pattern) for pattern in exclusions):
+        return False
+    return True
+
+def age_bucket(days):
+    for limit, label in AGE_BUCKETS:
+        if limit is None or days < limit:
+            return label
+
+def empty_tally():
+    return {"count": 0, "bytes": 0}
+
+def add_to_tally(tally, size):
+    tally["count"] += 1
+    tally["bytes"] += size
+
+class FootprintReport:
+    """
+    Running totals - memory depends on the number of rules, prefixes and age buckets, never on the bucket size
+    """
+    def __init__(self, rules, as_of):
+        self.rules = rules
+        self.as_of = as_of
+        # Prefixes named by any rule, longest first so the most specific one wins
+        self.prefixes = sorted({prefix for rule in rules
+                                for prefix in ((rule.get("object-name-filter") or {}).get("inclusion-prefixes") or [])},
+                               key=len, reverse=True)
+        self.footprint = {}
+        self.per_rule = {rule["name"]: {"matched": empty_tally(), "due": empty_tally(), "effective": empty_tally()}
+                         for rule in rules}
+        self.outcome = {action: empty_tally() for action in ["DELETE", "ARCHIVE", "INFREQUENT_ACCESS", "RETAIN"]}
+        self.delete_markers = 0
+        self.versions = 0
+
+    def prefix_of(self, object_name):
+        for prefix in self.prefixes:
+            if object_name.startswith(prefix):
+                return prefix
+        return "(other)"
+
+    def add_version(self, version, is_current, noncurrent_since):
+        """One object version - noncurrent_since is when it stopped being current (previous versions only)"""
+        if getattr(version, "is_delete_marker", False):
+            self.delete_markers += 1
+            return
+        self.versions += 1
+        size = version.size or 0
+        modified = version.time_modified or version.time_created
+        age_days = (self.as_of - modified).total_seconds() / 86400
+
+        state = "current" if is_current else "previous"
+        key = (self.prefix_of(version.name), age_bucket(age_days), state)
+        add_to_tally(self.footprint.setdefault(key, empty_tally()), size)
+
+        # Previous versions age from the moment they were superseded
+        rule_age = age_days if is_current else (self.as_of - (noncurrent_since or modified)).total_seconds() / 86400
+        target = "objects" if is_current else "previous-object-versions"
+        winner = None
+        for rule in self.rules:
+            if rule["target"] != target or not rule_matches(rule, version.name):
+                continue
+            tallies = self.per_rule[rule["name"]]
+            add_to_tally(tallies["matched"], size)
+            if rule_age >= rule_days(rule):
+                add_to_tally(tallies["due"], size)
+                if winner is None or ACTION_PRIORITY[rule["action"]] > ACTION_PRIORITY[winner["action"]]:
+                    winner = rule
+        if winner:
+            add_to_tally(self.per_rule[winner["name"]]["effective"], size)
+            add_to_tally(self.outcome[winner["action"]], size)
+        else:
+            add_to_tally(self.outcome["RETAIN"], size)
+
+    def add_multipart(self, upload):
+        age_days = (self.as_of - upload.time_created).total_seconds() / 86400
+        for rule in self.rules:
+            if rule["target"] != "multipart-uploads" or not rule_matches(rule, upload.object):
+                continue
+            tallies = self.per_rule[rule["name"]]
+            tallies["matched"]["count"] += 1
+            if age_days >= rule_days(rule):
+                tallies["due"]["count"] += 1
+                tallies["effective"]["count"] += 1
+
+    def to_dict(self):
+        return {
+            "as_of": self.as_of.isoformat(),
+            "versions": self.versions,
+            "delete_markers": self.delete_markers,
+            "footprint": [{"prefix": prefix, "age": age, "state": state, **tally}
+                          for (prefix, age, state), tally in sorted(self.footprint.items())],
+            "rules": self.per_rule,
+            "outcome": self.outcome,
+        }
+
+    def print(self):
+        labels = [label for _, label in AGE_BUCKETS]
+        print(f"Footprint as of {self.as_of:%Y-%m-%d} (GB / count)", flush=True)
+        for prefix in sorted({key[0] for key in self.footprint}):
+            for state in ["current", "previous"]:
+                row = [self.footprint.get((prefix, label, state)) for label in labels]
+                if not any(row):
+                    continue
+                cells = " | ".join(f"{label}: {tally['bytes'] / GB:.2f}/{tally['count']}" for label, tally in zip(labels, row) if tally)
+                print(f"  {prefix:<20} {state:<8} {cells}", flush=True)
+        print("Rules", flush=True)
+        for rule in self.rules:
+            tallies = self.per_rule[rule["name"]]
+            print(f"  {rule['name']:<32} {rule['action']:<17} {rule['target']:<24} after {rule['time-amount']} {rule['time-unit']} | "
+                  f"matched: {tallies['matched']['bytes'] / GB:.2f} GB/{tallies['matched']['count']} | "
+                  f"due: {tallies['due']['bytes'] / GB:.2f} GB/{tallies['due']['count']} | "
+                  f"effective: {tallies['effective']['bytes'] / GB:.2f} GB/{tallies['effective']['count']}", flush=True)
+        print("Outcome", flush=True)
+        for action, tally in self.outcome.items():
+            print(f"  {action:<17} {tally['bytes'] / GB:.2f} GB | {tally['count']} versions", flush=True)
+
+def evaluate_pages(report, tagged_pages):
+    """Feed (partition, versions) pages to the report"""
+    for classified in classify_versions(tagged_pages):
+        for version, is_current, superseded_at in classified:
+            # A delete marker on top means every real version is previous, superseded when the marker appeared
+            report.add_version(version, is_current and not version.is_delete_marker, superseded_at)
+
+def multipart_uploads(object_storage_client, namespace_name, bucket_name):
+    page = None
+    while True:
+        response = object_storage_client.list_multipart_uploads(namespace_name=namespace_name, bucket_name=bucket_name, page=page)
+        yield from response.data
+        page = response.next_page
+        if page is None:
+            return
+
+if __name__ == '__main__':
+    import oci_clients
+
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
+    parser.add_argument("-r", "--rules", help="lifecycle policy JSON", default="lifecycle_rules_14_60_180.json")
+    parser.add_argument("-d", "--date", type=str, help="evaluate as of this date (YYYY-MM-DD)")
+    parser.add_argument("-px", "--prefix", type=str, help="only names starting with this")
+    parser.add_argument("-pl", "--partitioned", type=int, metavar="LISTERS", help="concurrent prefix partitions to list")
+    parser.add_argument("-j", "--json", type=str, help="write the report as JSON to this file")
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name (if not default)")
+    args = parser.parse_args()
+
+    if args.date:
+        as_of = datetime.datetime.strptime(args.date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    else:
+        as_of = datetime.datetime.now(datetime.timezone.utc)
+
+    report = FootprintReport(load_rules(args.rules), as_of)
+
+    # Define OSS client and Namespace
+    object_storage_client = oci_clients.object_storage_client(args.profile)
+    namespace_name = oci_clients.get_namespace(args.profile)
+
+    start = time.time()
+    if args.partitioned:
+        pages = partitioned_pages(object_storage_client, namespace_name, args.bucket, prefix=args.prefix,
+                                  parallelism=args.partitioned, fields=LIST_FIELDS, versions=True,
+                                  verbose=args.verbose, tagged=True)
+    else:
+        pages = ((None, versions) for versions, _ in list_range_pages(object_storage_client, namespace_name, args.bucket,
+                                                                      LIST_FIELDS, True, prefix=args.prefix))
+    evaluate_pages(report, pages)
+    for upload in multipart_uploads(object_storage_client, namespace_name, args.bucket):
+        if not args.prefix or upload.object.startswith(args.prefix):
+            report.add_multipart(upload)
+    end = time.time()
+
+    report.print()
+    print(f"{os.getpid()} Evaluated {report.versions} versions, {report.delete_markers} delete markers | "
+          f"Time taken: {(end - start):.2f}s", flush=True)
+    if args.json:
+        with open(args.json, "w") as out_file:
+            json.dump(report.to_dict(), out_file, indent=2)
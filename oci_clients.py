@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+
+'''
+Shared OCI client layer for the backup scripts
+
+`import oci` normally imports every service package in the SDK, which is a noticeable part of a second
+on a small VM.  Importing this module first tells the SDK to skip that, and each service
+(object storage, file storage, core) is only imported the first time one of its clients is asked for.
+
+Config, namespace and clients are cached per profile, so each script builds them once.  Clients get
+the SDK default retry strategy and a connection pool sized for the script's parallelism.  The cache is
+per process - a forked worker builds its own clients instead of sharing the parent's connections.
+
+ from oci_clients import oci, object_storage_client, get_namespace
+ client = object_storage_client(profile)
+'''
+
+import os
+import threading
+import importlib
+
+# Must be set before the first `import oci` anywhere in the process
+os.environ.setdefault("OCI_PYTHON_SDK_NO_SERVICE_IMPORTS", "true")
+
+import oci
+
+# Service name -> (module, client class)
+SERVICES = {
+    "object_storage": ("oci.object_storage", "ObjectStorageClient"),
+    "file_storage": ("oci.file_storage", "FileStorageClient"),
+    "virtual_network": ("oci.core", "VirtualNetworkClient"),
+}
+
+# Connections kept per client - raise with set_pool_size() before creating clients for wide parallelism
+pool_size = 32
+
+_lock = threading.RLock()
+_configs = {}
+_clients = {}
+_namespaces = {}
+
+
+def set_pool_size(size):
+    """Connection pool size for clients created after this call"""
+    global pool_size
+    pool_size = max(size, 1)
+
+def get_config(profile=None):
+    """OCI config for the profile (default when None), read once"""
+    with _lock:
+        if profile not in _configs:
+            import oci.config
+            _configs[profile] = oci.config.from_file(profile_name=profile) if profile else oci.config.from_file()
+        return _configs[profile]
+
+def get_client(service, profile=None):
+    """Client for the service, imported and built on first use and cached per process"""
+    key = (os.getpid(), service, profile)
+    with _lock:
+        if key not in _clients:
+            module_name, class_name = SERVICES[service]
+            client_class = getattr(importlib.import_module(module_name), class_name)
+            import oci.retry
+            client = client_class(get_config(profile), retry_strategy=oci.retry.DEFAULT_RETRY_STRATEGY)
+            # Bigger pool so parallel threads reuse connections instead of opening (and dropping) extras.
+            # Keep the SDK's own adapter class, it carries OCI specific transport behaviour
+            from oci.base_client import OCIHTTPAdapter
+            client.base_client.session.mount("https://", OCIHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+            _clients[key] = client
+        return _clients[key]
+
+def object_storage_client(profile=None):
+    return get_client("object_storage", profile)
+
+def file_storage_client(profile=None):
+    return get_client("file_storage", profile)
+
+def virtual_network_client(profile=None):
+    return get_client("virtual_network", profile)
+
+def get_namespace(profile=None):
+    """Object Storage namespace, fetched once per profile"""
+    with _lock:
+        if profile not in _namespaces:
+            _namespaces[profile] = object_storage_client(profile).get_namespace().data
+        return _namespaces[profile]
@@ -0,0 +1,306 @@
+#! /usr/bin/env python3
+'''
+ Restores a backup from a versioned <share>_backup bucket to a local folder, as of a point in time
+
+ For every object under the prefix, the newest version created at or before the timestamp is picked
+ (objects whose version at that time is a delete marker did not exist and are skipped).  Downloads run in
+ parallel; objects over the threshold are fetched with ranged GETs in chunks, written with pwrite into a
+ preallocated <name>.partial file, which is renamed into place only when every GET succeeded (and removed
+ otherwise).  Owner, mode and times stored by oss_upload.py (stat_to_json) or rclone --metadata are
+ reapplied, and rclone --links symlinks (.rclonelink) are recreated as links.
+
+ Access the script by running as such:
+ $> python3 oss_restore.py -b share_backup -px FSS-dailyBackup/ -f /restore/share -t "2024-01-30 18:00"
+
+ The only required options are:
+ -b/--bucket        :   The name of the OCI OSS bucket to restore from
+ -f/--folder        :   The local folder to restore into.  The prefix is stripped from object names
+
+ Options:
+ -px/--prefix       :   Only restore objects under this prefix, eg FSS-dailyBackup/ or FSS-dailyBackup/home/
+ -t/--time          :   Restore versions as of this time (UTC, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]").  Defaults to latest
+ -p/--parallelism   :   Concurrent GET requests.  Defaults to 10
+ -th/--threshold    :   Size in bytes over which to use ranged multi-part GETs.  Defaults to 128M
+ -cs/--chunksize    :   Ranged GET size in bytes.  Defaults to 32M
+ --dryrun           :   Print what would be restored
+ -v/--verbose       :   Prints more information
+'''
+import os
+import re
+import time
+import datetime
+import threading
+import argparse
+import concurrent.futures
+from pathlib import Path
+
+import oci_clients
+from backup_common import GB, RCLONE_LINK_SUFFIX
+from bucket_lister import list_range_pages
+
+# Verbose
+verbose = False
+
+# MP threshold bytes
+mp_threshold = 128 * 1024 * 1024
+
+# Ranged GET size
+chunk_size = 32 * 1024 * 1024
+
+# Stream read size
+READ_SIZE = 1024 * 1024
+
+
+def parse_time(value: str) -> datetime.datetime:
+    """UTC timestamp from the command line"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(value, fmt).replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Cannot parse time: {value}")
+
+def versions_as_of(object_storage_client, namespace_name, bucket_name, prefix, as_of):
+    """
+    Newest version of each name created at or before as_of, skipping names whose version at that
+    time is a delete marker.  Versions of a name are listed newest first.
+    """
+    last_name = None
+    for versions, _ in list_range_pages(object_storage_client, namespace_name, bucket_name,
+                                        "name,size,timeCreated", True, prefix=prefix):
+        for version in versions:
+            if version.name == last_name:
+                continue
+            if as_of and version.time_created > as_of:
+                continue
+            # First version at or before the time decides this name
+            last_name = version.name
+            if not version.is_delete_marker:
+                yield version
+
+def local_path(folder: Path, prefix: str, object_name: str):
+    """Local file for an object - None if the name would escape the folder"""
+    relative = object_name[len(prefix):] if prefix else object_name
+    parts = [part for part in relative.split("/") if part]
+    if not parts or ".." in parts:
+        return None
+    return folder.joinpath(*parts)
+
+def parse_rfc3339(value: str) -> float:
+    """rclone metadata times - trim nanoseconds to what datetime can hold"""
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value.replace("Z", "+00:00"))
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+def file_attributes(headers) -> dict:
+    """
+    Owner, mode and times from opc-meta headers - oss_upload.py stat_to_json keys (st_mode, st_uid...)
+    or rclone --metadata keys (mode, uid, gid, atime, mtime)
+    """
+    meta = {key.lower()[len("opc-meta-"):]: value for key, value in headers.items() if key.lower().startswith("opc-meta-")}
+    attributes = {}
+    try:
+        if "st_mode" in meta:
+            attributes["mode"] = int(meta["st_mode"]) & 0o7777
+        elif "mode" in meta:
+            attributes["mode"] = int(meta["mode"], 8) & 0o7777
+        for key in ["uid", "gid"]:
+            if f"st_{key}" in meta or key in meta:
+                attributes[key] = int(meta.get(f"st_{key}", meta.get(key)))
+        for key in ["atime", "mtime"]:
+            value = meta.get(f"st_{key}", meta.get(key))
+            if value is None:
+                continue
+            try:
+                attributes[key] = float(value)
+            except ValueError:
+                attributes[key] = parse_rfc3339(value)
+    except (ValueError, TypeError) as exc:
+        if verbose:
+            print(f"{os.getpid()} Ignoring unreadable metadata {meta}: {exc}", flush=True)
+    return attributes
+
+def apply_attributes(path: Path, attributes: dict):
+    """Reapply owner (when allowed), mode and times"""
+    if "uid" in attributes or "gid" in attributes:
+        try:
+            os.chown(path, attributes.get("uid", -1), attributes.get("gid", -1))
+        except PermissionError:
+            pass
+    if "mode" in attributes:
+        os.chmod(path, attributes["mode"])
+    if "mtime" in attributes:
+        os.utime(path, (attributes.get("atime", attributes["mtime"]), attributes["mtime"]))
+
+def write_stream(response, fd, offset):
+    """pwrite a GET response body into the file starting at offset - returns bytes written"""
+    written = 0
+    for data in response.data.raw.stream(READ_SIZE, decode_content=False):
+        os.pwrite(fd, data, offset + written)
+        written += len(data)
+    return written
+
+class RestoreFile:
+    """One object being restored - large objects are split into ranged GETs that finish in any order"""
+    def __init__(self, version, path: Path):
+        self.version = version
+        self.path = path
+        # Written under this name and renamed into place once complete, so a failed restore leaves nothing behind
+        self.partial = path.with_name(path.name + ".partial")
+        self.fd = None
+        self.attributes = None
+        self.remaining = 0
+        self.failed = False
+        self.lock = threading.Lock()
+
+    def chunks(self):
+        size = self.version.size
+        if size <= mp_threshold:
+            return [None]
+        return [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+    def open(self, chunk_count):
+        """Create the partial file and preallocate so ranged writes land in place"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        if self.version.size:
+            try:
+                os.posix_fallocate(self.fd, 0, self.version.size)
+            except (AttributeError, OSError):
+                os.ftruncate(self.fd, self.version.size)
+        self.remaining = chunk_count
+
+    def fetch(self, object_storage_client, namespace_name, bucket_name, byte_range):
+        """
+        One GET (whole object or range) - the last one to finish closes the file and either applies metadata
+        and moves it into place, or removes it if any GET failed
+        """
+        try:
+            response = object_storage_client.get_object(
+                namespace_name=namespace_name,
+                bucket_name=bucket_name,
+                object_name=self.version.name,
+                version_id=self.version.version_id,
+                range=f"bytes={byte_range[0]}-{byte_range[1]}" if byte_range else None)
+            written = write_stream(response, self.fd, byte_range[0] if byte_range else 0)
+            with self.lock:
+                if self.attributes is None:
+                    self.attributes = file_attributes(response.headers)
+        except Exception:
+            self.failed = True
+            raise
+        finally:
+            with self.lock:
+                self.remaining -= 1
+                last = self.remaining == 0
+            if last:
+                os.close(self.fd)
+                if self.failed:
+                    self.partial.unlink(missing_ok=True)
+        if last and not self.failed:
+            try:
+                apply_attributes(self.partial, self.attributes)
+                os.replace(self.partial, self.path)
+            except OSError:
+                self.partial.unlink(missing_ok=True)
+                raise
+        return written
+
+def restore_link(object_storage_client, namespace_name, bucket_name, version, path: Path):
+    """rclone symlink object - the body is the link target"""
+    response = object_storage_client.get_object(
+        namespace_name=namespace_name,
+        bucket_name=bucket_name,
+        object_name=version.name,
+        version_id=version.version_id)
+    target = response.data.content.decode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.is_symlink() or path.exists():
+        path.unlink()
+    os.symlink(target, path)
+    return 0
+
+if __name__ == '__main__':
+
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-b", "--bucket", help="name of bucket", required=True)
+    parser.add_argument("-f", "--folder", type=Path, help="path to local folder to restore into", required=True)
+    parser.add_argument("-px", "--prefix", type=str, help="only restore objects under this prefix", default="")
+    parser.add_argument("-t", "--time", type=parse_time, help="restore versions as of this UTC time")
+    parser.add_argument("-p", "--parallelism", type=int, help="concurrent GET requests", default=10)
+    parser.add_argument("-th", "--threshold", type=int, help="threshold in bytes for ranged multi-part GET")
+    parser.add_argument("-cs", "--chunksize", type=int, help="ranged GET size in bytes")
+    parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name")
+    parser.add_argument("--dryrun", help="Dry Run - print what it would do", action="store_true")
+    args = parser.parse_args()
+
+    verbose = args.verbose
+    concurrency = args.parallelism
+    if args.threshold:
+        mp_threshold = args.threshold
+    if args.chunksize:
+        chunk_size = args.chunksize
+
+    print(f"**** Start - restoring {args.bucket}/{args.prefix} as of {args.time if args.time else 'latest'} to {args.folder} "
+          f"with parallelism of {concurrency} ***", flush=True)
+
+    oci_clients.set_pool_size(concurrency)
+    object_storage_client = oci_clients.object_storage_client(args.profile)
+    namespace_name = oci_clients.get_namespace(args.profile)
+
+    file_count = 0
+    byte_count = 0
+    error_count = 0
+    start = time.time()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # future -> object name; bounded so listing doesn't run away from the downloads
+        in_flight = {}
+
+        def reap(return_when):
+            global byte_count, error_count
+            done, _ = concurrent.futures.wait(list(in_flight), return_when=return_when)
+            for future in done:
+                object_name = in_flight.pop(future)
+                if future.exception() is not None:
+                    error_count += 1
+                    print(f"{os.getpid()} ERROR: Restore failed: {object_name} | {future.exception()}", flush=True)
+                else:
+                    byte_count += future.result()
+
+        for version in versions_as_of(object_storage_client, namespace_name, args.bucket, args.prefix, args.time):
+            # Folder placeholder objects
+            if version.name.endswith("/"):
+                continue
+            path = local_path(args.folder, args.prefix, version.name)
+            if path is None:
+                print(f"{os.getpid()} Skipping object outside folder: {version.name}", flush=True)
+                continue
+            file_count += 1
+            if verbose or args.dryrun:
+                print(f"{'Dry Run: ' if args.dryrun else ''}{version.name} ({version.version_id}, {version.time_created}) -> {path} "
+                      f"Size: {version.size} bytes", flush=True)
+            if args.dryrun:
+                continue
+
+            if version.name.endswith(RCLONE_LINK_SUFFIX):
+                link_path = path.with_name(path.name[:-len(RCLONE_LINK_SUFFIX)])
+                tasks = [(restore_link, (object_storage_client, namespace_name, args.bucket, version, link_path))]
+            else:
+                restore_file = RestoreFile(version, path)
+                chunks = restore_file.chunks()
+                restore_file.open(len(chunks))
+                tasks = [(restore_file.fetch, (object_storage_client, namespace_name, args.bucket, byte_range)) for byte_range in chunks]
+
+            for fn, fn_args in tasks:
+                while len(in_flight) >= concurrency * 2:
+                    reap(concurrent.futures.FIRST_COMPLETED)
+                in_flight[executor.submit(fn, *fn_args)] = version.name
+
+        while in_flight:
+            reap(concurrent.futures.ALL_COMPLETED)
+    end = time.time()
+
+    print(f"{os.getpid()} Restored {file_count} objects | {byte_count / GB:.2f} GB | Errors: {error_count} | "
+          f"Time taken: {(end - start):.2f}s | {byte_count / (1024 * 1024) / max(end - start, 0.001):.2f} MB/s", flush=True)
@@ -16,14 +16,19 @@
  -p/--parallelism   :   Level of parallelism - # of processes to use 
  -w/--write         :   Add enclosing folder to the path.  For example, if the folder is /a/b/c, all files under c are uploaded, but c/file would be in the object name
  -th/--threshold    :   Size in bytes over which to favor multi-part upload instead of object PUT.   Defaults to 128M
+ -ri/--reportinterval : Seconds between progress reports (files, bytes, MB/s, in-flight requests, errors, ETA).  Defaults to 30
+ -sf/--summaryfile  :   Also write the final JSON summary (including PUT and part latency percentiles, and the files that failed) to this file
  -v/--verbose       :   Prints more information
 '''
 import os
 import time
-import oci
+import json
+import functools
+import threading
+import multiprocessing
+import oci_clients
+from backup_common import GB
 from concurrent.futures import ProcessPoolExecutor
-from itertools import repeat
-from multiprocessing.connection import wait
 from oci.object_storage import UploadManager
 from oci.object_storage.transfer.constants import DEFAULT_PART_SIZE
 from pathlib import Path
@@ -50,22 +55,174 @@ concurrency = 5
 # MP threashold bytes
 mp_threshold = DEFAULT_PART_SIZE
 
+# Progress report interval (seconds)
+report_interval = 30
+
+# Failed files named in the summary - the error count covers the rest
+MAX_FAILED_LISTED = 100
+
+# Shared memory counters - created by the parent, handed to each worker by init_worker
+bytes_done = None
+in_flight = None
+
+# Multipart part latencies for the file this worker is uploading
+part_latencies = []
+
+
+def init_worker(shared_bytes_done, shared_in_flight):
+    """Process Pool initializer - attach the parent's shared counters to this worker"""
+    global bytes_done, in_flight
+    bytes_done = shared_bytes_done
+    in_flight = shared_in_flight
+
+def add_to_counter(counter, amount):
+    """Add to a shared counter (no-op when not running under the pool)"""
+    if counter is None:
+        return
+    with counter.get_lock():
+        counter.value += amount
 
 def progress_callback(bytes_uploaded):
-    return
-    #print("{} additional bytes uploaded".format(bytes_uploaded))
+    add_to_counter(bytes_done, bytes_uploaded)
+
+def percentiles(samples: list) -> dict:
+    """Latency percentiles (seconds) for the final summary"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def pick(pct):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 4)
+    return {"count": len(ordered), "p50": pick(50), "p90": pick(90), "p99": pick(99), "max": round(ordered[-1], 4)}
+
+def format_eta(seconds) -> str:
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+class ProgressTracker:
+    """
+    Parent side aggregation of progress across all worker processes.
+    Bytes and in-flight requests come from shared memory counters updated by the workers,
+    file completions, errors and latencies come back through the futures.
+    """
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.bytes_done = multiprocessing.Value('q', 0)
+        self.in_flight = multiprocessing.Value('i', 0)
+        self.lock = threading.Lock()
+        self.files_submitted = 0
+        self.bytes_submitted = 0
+        self.files_done = 0
+        self.errors = 0
+        self.failed_files = []
+        self.walk_complete = False
+        self.put_latencies = []
+        self.part_latencies = []
+        self.start = time.time()
+        self.last_time = self.start
+        self.last_bytes = 0
+        self.stop_event = threading.Event()
+        self.reporter = threading.Thread(target=self._report_loop, daemon=True)
+
+    def submitted(self, size: int):
+        with self.lock:
+            self.files_submitted += 1
+            self.bytes_submitted += size
+
+    def skipped(self, path: str, exc: OSError):
+        """File that could not be read in the walk (broken link, removed since listed) - counted as an error"""
+        with self.lock:
+            self.files_submitted += 1
+            self.files_done += 1
+            self._failed(path)
+        print(f"ERROR: Skipping {path}: {exc}", flush=True)
+
+    def completed(self, path, future):
+        """Future done callback (bound to the file's path) - runs in the parent"""
+        with self.lock:
+            self.files_done += 1
+            if future.exception() is not None:
+                self._failed(path)
+                print(f"ERROR: Upload failed: {path}: {future.exception()}", flush=True)
+                return
+            result = future.result()
+            if result["method"] == "put":
+                self.put_latencies.append(result["seconds"])
+            self.part_latencies.extend(result["part_latencies"])
+
+    def _failed(self, path):
+        """Count a failed file - called with the lock held"""
+        self.errors += 1
+        if len(self.failed_files) < MAX_FAILED_LISTED:
+            self.failed_files.append(path)
+
+    def report(self):
+        now = time.time()
+        done = self.bytes_done.value
+        rate = (done - self.last_bytes) / max(now - self.last_time, 0.001)
+        self.last_time, self.last_bytes = now, done
+        overall_rate = done / max(now - self.start, 0.001)
+        # Only trust the ETA once the walk has found every file
+        eta = (self.bytes_submitted - done) / overall_rate if self.walk_complete and overall_rate > 0 else None
+        print(f"Progress: {self.files_done}/{self.files_submitted}{'' if self.walk_complete else '+'} files | "
+              f"{done / GB:.2f}/{self.bytes_submitted / GB:.2f} GB | "
+              f"{rate / (1024 * 1024):.2f} MB/s | In-flight: {self.in_flight.value} | Errors: {self.errors} | "
+              f"ETA: {format_eta(eta)}", flush=True)
+
+    def _report_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.report()
+
+    def begin(self):
+        self.reporter.start()
+
+    def finish(self) -> dict:
+        self.stop_event.set()
+        self.reporter.join()
+        elapsed = time.time() - self.start
+        return {
+            "files": self.files_submitted,
+            "files_done": self.files_done,
+            "errors": self.errors,
+            "failed_files": self.failed_files,
+            "bytes": self.bytes_done.value,
+            "seconds": round(elapsed, 2),
+            "mb_per_sec": round(self.bytes_done.value / (1024 * 1024) / max(elapsed, 0.001), 2),
+            "put_latency": percentiles(self.put_latencies),
+            "part_latency": percentiles(self.part_latencies),
+        }
 
 def stat_to_json(fp: str) -> dict:
     s_obj = os.stat(fp)
     return {k: str(getattr(s_obj, k)) for k in dir(s_obj) if k.startswith('st_')}
 
-def uploadOSSProcess(path: str, filename: str, base_object_name: str, namespace, bucket_name, verbose: bool, config):
+def worker_client(profile):
+    """
+    This worker's client - built once per process by oci_clients, with upload_part timed
+    (the UploadManager calls upload_part on this client from its own threads)
+    """
+    object_storage_client = oci_clients.object_storage_client(profile)
+    if not getattr(object_storage_client, "timed", False):
+        upload_part = object_storage_client.upload_part
+        def timed_upload_part(*args, **kwargs):
+            add_to_counter(in_flight, 1)
+            part_start = time.time()
+            try:
+                return upload_part(*args, **kwargs)
+            finally:
+                part_latencies.append(time.time() - part_start)
+                add_to_counter(in_flight, -1)
+        object_storage_client.upload_part = timed_upload_part
+        object_storage_client.timed = True
+    return object_storage_client
+
+def uploadOSSProcess(path: str, filename: str, base_object_name: str, namespace, bucket_name, verbose: bool, profile) -> dict:
 
-    # Initialize (don't like this)
-    #config = oci.config.from_file()
-    object_storage_client = oci.object_storage.ObjectStorageClient(config)
+    # Client and namespace are reused across files in this process
+    object_storage_client = worker_client(profile)
     upload_manager = UploadManager(object_storage_client, allow_parallel_uploads=True,)
-    namespace = object_storage_client.get_namespace().data
+    part_latencies.clear()
 
     full_file_name = path + "/" + filename
     # If root directory object, just use filename as object name
@@ -94,17 +251,25 @@ def uploadOSSProcess(path: str, filename: str, base_object_name: str, namespace,
             end = time.time()
             if verbose:
                 print(f"{os.getpid()} Finished MP uploading {full_file_name} Time: {(end - start):.2f}s Size: {os.stat(full_file_name).st_size} bytes")
+            method = "multipart"
         else:
             # Reg put  
-            object_storage_client.put_object(
-                namespace_name=namespace, 
-                bucket_name=bucket_name, 
-                object_name=object_name, 
-                put_object_body=in_file,
-                opc_meta=object_metadata)
+            add_to_counter(in_flight, 1)
+            try:
+                object_storage_client.put_object(
+                    namespace_name=namespace, 
+                    bucket_name=bucket_name, 
+                    object_name=object_name, 
+                    put_object_body=in_file,
+                    opc_meta=object_metadata)
+            finally:
+                add_to_counter(in_flight, -1)
             end = time.time()
+            add_to_counter(bytes_done, os.stat(full_file_name).st_size)
             if verbose:
                 print(f"{os.getpid()} Finished PUT uploading {full_file_name} Time: {(end - start):.2f}s Size: {os.stat(full_file_name).st_size} bytes")
+            method = "put"
+    return {"object": object_name, "method": method, "seconds": end - start, "part_latencies": list(part_latencies)}
 
 if __name__ == '__main__':
 
@@ -118,6 +283,8 @@ if __name__ == '__main__':
     parser.add_argument("-f", "--folder", type=Path, help="path to local folder to upload", required=True)
     parser.add_argument("-th", "--threshold", type=int, help="threshold in bytes for multi-part upload")
     parser.add_argument("-pr", "--profile", type=str, help="OCI Profile name")
+    parser.add_argument("-ri", "--reportinterval", type=int, help="seconds between progress reports")
+    parser.add_argument("-sf", "--summaryfile", type=str, help="write final JSON summary to this file")
     args = parser.parse_args()
 
 
@@ -148,19 +315,21 @@ if __name__ == '__main__':
     if args.threshold:
         mp_threshold = args.threshold
 
-    print (f"**** Start - using {folder} with parallelism of {concurrency} and File threshold: {mp_threshold}.  Bucket name={bucket_name} ***")
+    # Report Interval
+    if args.reportinterval:
+        report_interval = args.reportinterval
 
-    # Define OSS client and Namespace
-    if profile:
-        config = oci.config.from_file(profile_name=profile)
-    else:
-        config = oci.config.from_file()
+    print (f"**** Start - using {folder} with parallelism of {concurrency} and File threshold: {mp_threshold}.  Bucket name={bucket_name} ***")
 
-    object_storage_client = oci.object_storage.ObjectStorageClient(config)
-    namespace = object_storage_client.get_namespace().data
+    # Namespace is fetched once here and handed to the workers
+    namespace = oci_clients.get_namespace(profile)
  
+    # Shared counters for cross-process progress, reported from a parent thread
+    tracker = ProgressTracker(report_interval)
+    tracker.begin()
+
     # Try with Process Pool
-    with ProcessPoolExecutor(concurrency) as executor:
+    with ProcessPoolExecutor(concurrency, initializer=init_worker, initargs=(tracker.bytes_done, tracker.in_flight)) as executor:
         # os.walk does recursive file tree walk and gives us paths 
         for (root,dirs,files) in os.walk(folder, topdown=True):
             # For each directory you get a tuple - files is a list within that tuple
@@ -183,12 +352,24 @@ if __name__ == '__main__':
             if verbose:
                 print(f"Base Object Name :  {base_object_name}")
             # This is what takes the list of all files and sends it to the Process Pool
-            # results is a Future List, but should be empty
             # pseudocode here:
             # For each file in the list, call the uploadOSS function, but use the folder name for each file.  Also the namespace and verbosity are passed into it.
-            results = executor.map(uploadOSSProcess,repeat(root),files,repeat(base_object_name),repeat(namespace),repeat(bucket_name),repeat(verbose),repeat(config))
-    for result in results:
-        # This is only to make the program wait for all of the files to be processed.
-        if verbose:
-            print (f"Result {result}")
+            # Completion is tallied by the tracker as each future finishes, so we don't hold on to the futures
+            for filename in files:
+                try:
+                    size = os.stat(os.path.join(root, filename)).st_size
+                except OSError as exc:
+                    tracker.skipped(os.path.join(root, filename), exc)
+                    continue
+                tracker.submitted(size)
+                future = executor.submit(uploadOSSProcess, root, filename, base_object_name, namespace, bucket_name, verbose, profile)
+                future.add_done_callback(functools.partial(tracker.completed, os.path.join(root, filename)))
+        tracker.walk_complete = True
+    # Exiting the pool waits for all of the files to be processed
+    tracker.report()
+    summary = tracker.finish()
+    print(f"SUMMARY {json.dumps(summary)}", flush=True)
+    if args.summaryfile:
+        with open(args.summaryfile, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
 
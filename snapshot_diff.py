@@ -0,0 +1,150 @@
+#! /usr/bin/env python3
+
+'''
+Changed and deleted files between two snapshots of the same file system (eg two FSS snapshots under .snapshot/)
+
+Both trees are walked together in parallel.  A file is changed when it is new, or its type, size, mtime or
+ctime differ from the old snapshot - snapshots keep the inode times, so an untouched file compares equal.
+Files only in the old snapshot (including everything under a removed directory) are deleted.
+
+Both snapshots are stat-walked in full.  No subtree can be skipped on an unchanged directory mtime: that
+only moves when entries are added, removed or renamed, so a file rewritten in place, or any change further
+down, leaves it alone.
+
+Names are relative to the snapshot root, with rclone's .rclonelink suffix on symlinks (as stored with
+--links), ready for rclone --files-from-raw.
+
+Used by fss_backup.py (--incremental), and standalone:
+ $> python3 snapshot_diff.py -o /mnt/temp-backup/.snapshot/FSS-dailyBackup-A -n /mnt/temp-backup/.snapshot/FSS-dailyBackup-B
+'''
+
+import os
+import stat
+import time
+import threading
+import argparse
+
+from backup_common import GB, RCLONE_LINK_SUFFIX, TaskTree
+
+
+def entries(directory):
+    """name -> lstat of every entry in the directory"""
+    with os.scandir(directory) as scan:
+        return {entry.name: entry.stat(follow_symlinks=False) for entry in scan}
+
+def object_name(relative, entry_stat):
+    """Name as rclone stores it - None for what rclone does not back up (sockets, fifos, devices)"""
+    if stat.S_ISLNK(entry_stat.st_mode):
+        return relative + RCLONE_LINK_SUFFIX
+    if stat.S_ISREG(entry_stat.st_mode):
+        return relative
+    return None
+
+def unchanged(old_stat, new_stat):
+    return (stat.S_IFMT(old_stat.st_mode) == stat.S_IFMT(new_stat.st_mode) and old_stat.st_size == new_stat.st_size
+            and old_stat.st_mtime_ns == new_stat.st_mtime_ns and old_stat.st_ctime_ns == new_stat.st_ctime_ns)
+
+def diff_trees(old_root, new_root, parallelism=8, verbose=False):
+    """
+    Walk both snapshots - returns the report dict with the "changed" and "deleted" names.
+    Any error reading either tree is raised, since a partial diff must not be used.
+    """
+    start = time.time()
+    lock = threading.Lock()
+    report = {"old_root": old_root, "new_root": new_root, "directories": 0, "files": 0,
+              "changed_bytes": 0, "changed": [], "deleted": []}
+
+    tasks = TaskTree(parallelism)
+
+    def add(category, name, size=0):
+        with lock:
+            report[category].append(name)
+            if category == "changed":
+                report["changed_bytes"] += size
+        if verbose:
+            print(f"{os.getpid()} {category}: {name}", flush=True)
+
+    def removed(relative_dir):
+        """Everything under a directory that is gone from the new snapshot"""
+        for name, entry_stat in entries(os.path.join(old_root, relative_dir)).items():
+            relative = f"{relative_dir}{name}"
+            if stat.S_ISDIR(entry_stat.st_mode):
+                tasks.submit(removed, f"{relative}/")
+            elif object_name(relative, entry_stat):
+                add("deleted", object_name(relative, entry_stat))
+
+    def compare(relative_dir, in_old):
+        """One directory of the new snapshot against the old one (in_old False when it is new)"""
+        new_entries = entries(os.path.join(new_root, relative_dir))
+        old_entries = entries(os.path.join(old_root, relative_dir)) if in_old else {}
+        with lock:
+            report["directories"] += 1
+            report["files"] += len(new_entries)
+
+        for name in old_entries.keys() - new_entries.keys():
+            old_stat = old_entries[name]
+            if stat.S_ISDIR(old_stat.st_mode):
+                tasks.submit(removed, f"{relative_dir}{name}/")
+            elif object_name(f"{relative_dir}{name}", old_stat):
+                add("deleted", object_name(f"{relative_dir}{name}", old_stat))
+
+        for name, new_stat in new_entries.items():
+            relative = f"{relative_dir}{name}"
+            old_stat = old_entries.get(name)
+            # Type changed - the old object (or tree) goes, the new one is compared as new
+            if old_stat is not None and stat.S_IFMT(old_stat.st_mode) != stat.S_IFMT(new_stat.st_mode):
+                if stat.S_ISDIR(old_stat.st_mode):
+                    tasks.submit(removed, f"{relative}/")
+                elif object_name(relative, old_stat):
+                    add("deleted", object_name(relative, old_stat))
+                old_stat = None
+            if stat.S_ISDIR(new_stat.st_mode):
+                tasks.submit(compare, f"{relative}/", old_stat is not None)
+                continue
+            if old_stat is not None and unchanged(old_stat, new_stat):
+                continue
+            if object_name(relative, new_stat):
+                add("changed", object_name(relative, new_stat), new_stat.st_size)
+
+    tasks.submit(compare, "", True)
+    tasks.wait()
+    tasks.shutdown()
+
+    if tasks.errors:
+        args, exc = tasks.errors[0]
+        raise OSError(f"Snapshot diff failed with {len(tasks.errors)} errors, first: {args[0]}: {exc}")
+    report["changed"].sort()
+    report["deleted"].sort()
+    report["seconds"] = round(time.time() - start, 2)
+    return report
+
+def write_list(names, path):
+    """One name per line, for rclone --files-from-raw"""
+    with open(path, "w", encoding="utf-8", errors="surrogateescape") as out_file:
+        for name in names:
+            out_file.write(f"{name}\n")
+    return path
+
+def summary_line(report):
+    return (f"Snapshot diff | Directories: {report['directories']} | "
+            f"Entries: {report['files']} | Changed: {len(report['changed'])} ({report['changed_bytes'] / GB:.2f} GB) | "
+            f"Deleted: {len(report['deleted'])} | Time taken: {report['seconds']:.2f}s")
+
+if __name__ == '__main__':
+
+    # Parse Arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", help="print every changed and deleted name", action="store_true")
+    parser.add_argument("-o", "--old", type=str, help="previous snapshot root", required=True)
+    parser.add_argument("-n", "--new", type=str, help="new snapshot root", required=True)
+    parser.add_argument("-p", "--parallelism", type=int, help="parallel directory walkers", default=8)
+    parser.add_argument("-c", "--changedfile", type=str, help="write the changed names here")
+    parser.add_argument("-d", "--deletedfile", type=str, help="write the deleted names here")
+    args = parser.parse_args()
+
+    report = diff_trees(args.old, args.new, parallelism=args.parallelism, verbose=args.verbose)
+    print(summary_line(report), flush=True)
+    if args.changedfile:
+        write_list(report["changed"], args.changedfile)
+    if args.deletedfile:
+        write_list(report["deleted"], args.deletedfile)
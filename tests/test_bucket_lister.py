@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from bucket_lister import KNOWN_PREFIXES, classify_versions, plan_partitions, prefix_end
+
+NAMES = ["", "A", "FSS", "FSS-", "FSS-dailyBackup", "FSS-dailyBackup/", "FSS-dailyBackup/a/b", "FSS-dailyBackup0",
+         "FSS-monthly", "FSS-monthly-2024-01-31/x", "FSS-monthlz", "FSS-weekly-2024-01-05/y", "FSS-weeklz",
+         "FSS-z", "Z", "a", "￿"]
+
+
+def partitions_of(name, seeds, ranges):
+    hits = [seed for seed in seeds if name.startswith(seed)]
+    hits += [(start, end) for start, end in ranges
+             if (start is None or name >= start) and (end is None or name < end)]
+    return hits
+
+
+def test_prefix_end():
+    assert prefix_end("FSS-weekly") == "FSS-weeklz"
+    assert prefix_end("a/") == "a0"
+
+
+def test_whole_bucket_is_covered_once():
+    seeds, ranges = plan_partitions()
+    assert seeds == sorted(KNOWN_PREFIXES)
+    for name in NAMES:
+        assert len(partitions_of(name, seeds, ranges)) == 1, name
+
+
+def test_prefix_covering_known_prefixes():
+    seeds, ranges = plan_partitions("FSS-")
+    assert seeds == sorted(KNOWN_PREFIXES)
+    for name in NAMES:
+        expected = 1 if name.startswith("FSS-") else 0
+        assert len(partitions_of(name, seeds, ranges)) == expected, name
+
+
+def test_prefix_inside_known_prefix():
+    assert plan_partitions("FSS-dailyBackup/home/") == (["FSS-dailyBackup/home/"], [])
+
+
+def test_classify_versions_across_pages_and_partitions():
+    a9, a5, a2 = (SimpleNamespace(name="a", time_created=day) for day in (9, 5, 2))
+    b3 = SimpleNamespace(name="b", time_created=3)
+    other = SimpleNamespace(name="a", time_created=8)
+    pages = [("p1", [a9]), ("p2", [other]), ("p1", [a5, a2]), ("p1", [b3])]
+    assert list(classify_versions(pages)) == [[(a9, True, None)], [(other, True, None)],
+                                              [(a5, False, 9), (a2, False, 5)], [(b3, True, None)]]
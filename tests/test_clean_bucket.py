@@ -0,0 +1,47 @@
+import datetime
+from types import SimpleNamespace
+
+from bucket_lister import classify_versions
+from clean_bucket import version_tasks
+
+NOW = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+CUTOFF = NOW - datetime.timedelta(days=60)
+
+
+def version(name, days_ago, delete_marker=False):
+    return SimpleNamespace(name=name, version_id=f"{name}@{days_ago}", time_created=NOW - datetime.timedelta(days=days_ago),
+                           is_delete_marker=delete_marker)
+
+
+def deleted(tagged_pages, **kwargs):
+    return [task[2] for classified in classify_versions(tagged_pages) for task in version_tasks(classified, **kwargs)]
+
+
+# "keep" is old and unchanged - its only version is current, however old.  "edited" was replaced 90 and 30 days ago:
+# the version from 200 days ago stopped being current 90 days ago, the one from 90 days ago only 30 days ago.
+PAGES = [(None, [version("edited", 30), version("edited", 90)]),
+         (None, [version("edited", 200), version("keep", 400)]),
+         (None, [version("removed", 70, delete_marker=True), version("removed", 300)])]
+
+
+def test_older_than_keeps_current_and_ages_previous_from_when_superseded():
+    assert deleted(PAGES, older_than=CUTOFF) == ["edited@200", "removed@300"]
+
+
+def test_include_current_ages_current_versions_by_creation():
+    assert deleted(PAGES, older_than=CUTOFF, include_current=True) == ["edited@200", "keep@400", "removed@70", "removed@300"]
+
+
+def test_without_cutoff_everything_goes():
+    assert len(deleted(PAGES)) == 6
+
+
+def test_prefix():
+    assert deleted(PAGES, older_than=CUTOFF, prefix="rem") == ["removed@300"]
+
+
+def test_partitions_keep_their_own_state():
+    # Partitioned listings interleave pages - a/x@200 follows a/x@70 in its own partition, so it is previous
+    # (superseded 70 days ago) even though a page of another partition came in between
+    pages = [("p1", [version("a/x", 70)]), ("p2", [version("b/y", 300)]), ("p1", [version("a/x", 200)])]
+    assert deleted(pages, older_than=CUTOFF) == ["a/x@200"]
@@ -0,0 +1,41 @@
+import datetime
+import threading
+from types import SimpleNamespace
+
+from fss_backup import FssBackup, next_run_time, scheduled_type
+
+FRIDAY = 4
+
+
+def test_scheduled_type():
+    assert scheduled_type(datetime.date(2026, 10, 19), FRIDAY) == "daily"
+    assert scheduled_type(datetime.date(2026, 10, 23), FRIDAY) == "weekly"
+    assert scheduled_type(datetime.date(2026, 10, 30), FRIDAY) == "monthly"
+    assert scheduled_type(datetime.date(2026, 10, 31), FRIDAY) == "daily"
+
+
+def test_next_run_time_later_today():
+    now = datetime.datetime(2026, 10, 19, 1, 30)
+    assert next_run_time(now, datetime.time(2, 0), range(7)) == datetime.datetime(2026, 10, 19, 2, 0)
+
+
+def test_next_run_time_passed_today():
+    now = datetime.datetime(2026, 10, 19, 2, 0)
+    assert next_run_time(now, datetime.time(2, 0), range(7)) == datetime.datetime(2026, 10, 20, 2, 0)
+
+
+def test_next_run_time_skips_to_a_run_day():
+    # Friday evening, weekdays only - next is Monday
+    now = datetime.datetime(2026, 10, 23, 22, 15, 7)
+    assert next_run_time(now, datetime.time(2, 0), {0, 1, 2, 3, 4}) == datetime.datetime(2026, 10, 26, 2, 0)
+
+
+def test_unavailable_history_gives_no_predictions(tmp_path):
+    backup = FssBackup.__new__(FssBackup)
+    backup.args = SimpleNamespace(sortbytes=False, sortduration="longest", estimate=False)
+    backup.history_db = str(tmp_path / "missing" / "history.db")
+    backup.history_local = threading.local()
+    shares = [SimpleNamespace(id="a", metered_bytes=1), SimpleNamespace(id="b", metered_bytes=2)]
+    ordered, predictions = backup.order_shares(shares, "daily")
+    assert predictions == {"a": None, "b": None}
+    assert sorted(share.id for share in ordered) == ["a", "b"]
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from fss_verify import PART_SIZES, candidate_part_sizes, file_md5, verify_tree
+
+MB = 1024 * 1024
+
+
+def b64md5(data):
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+def multipart_md5(data, part_size):
+    digests = [hashlib.md5(data[i:i + part_size]).digest() for i in range(0, len(data), part_size)]
+    return f"{base64.b64encode(hashlib.md5(b''.join(digests)).digest()).decode()}-{len(digests)}"
+
+
+class FakeObjectStorage:
+    """In memory bucket - objects is name -> (size, md5), listed a few at a time"""
+    def __init__(self, objects, page_size=2):
+        self.objects = objects
+        self.page_size = page_size
+
+    def list_objects(self, namespace_name, bucket_name, prefix=None, start=None, end=None, delimiter=None, fields=None):
+        names, prefixes = [], []
+        for name in sorted(self.objects):
+            if (prefix and not name.startswith(prefix)) or (start and name < start) or (end and name >= end):
+                continue
+            rest = name[len(prefix or ""):]
+            if delimiter and delimiter in rest:
+                sub_prefix = (prefix or "") + rest.split(delimiter)[0] + delimiter
+                if sub_prefix not in prefixes:
+                    prefixes.append(sub_prefix)
+                continue
+            names.append(name)
+        page = names[:self.page_size]
+        next_start = names[self.page_size] if len(names) > self.page_size else None
+        objects = [SimpleNamespace(name=name, size=self.objects[name][0], md5=self.objects[name][1]) for name in page]
+        return SimpleNamespace(data=SimpleNamespace(objects=objects, prefixes=prefixes, next_start_with=next_start))
+
+    def head_object(self, namespace_name, bucket_name, object_name):
+        return SimpleNamespace(headers={"content-md5": self.objects[object_name][1]})
+
+
+def test_candidate_part_sizes():
+    assert candidate_part_sizes(40 * MB, 3) == [16 * MB, 14 * MB]
+    assert candidate_part_sizes(300 * MB, 3) == [128 * MB, 100 * MB]
+    # 20 parts of an odd size - only the size implied by the count fits
+    assert candidate_part_sizes(200 * MB, 20) == [10 * MB]
+    for part_size in candidate_part_sizes(1000 * MB + 1, 8):
+        assert -(-(1000 * MB + 1) // part_size) == 8
+
+
+def test_file_md5_single_part(tmp_path):
+    data = b"hello world" * 1000
+    path = tmp_path / "small"
+    path.write_bytes(data)
+    assert file_md5(str(path), len(data), b64md5(data)) == b64md5(data)
+    assert file_md5(str(path), len(data), None) == b64md5(data)
+
+
+@pytest.mark.parametrize("size", [2 * PART_SIZES[0] + 12345, 2 * PART_SIZES[0]])
+def test_file_md5_multipart(tmp_path, size):
+    data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    path = tmp_path / "large"
+    path.write_bytes(data)
+    expected = multipart_md5(data, PART_SIZES[0])
+    assert file_md5(str(path), size, expected) == expected
+    wrong = f"{b64md5(b'other')}-{expected.rsplit('-', 1)[1]}"
+    assert file_md5(str(path), size, wrong) != wrong
+
+
+def test_verify_tree(tmp_path):
+    files = {"a.txt": b"alpha", "d/b.txt": b"bravo", "d/e/c.txt": b"charlie", "d/e/f/g.txt": b"golf", "z.txt": b"zulu"}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "link").symlink_to("a.txt")
+    objects = {f"backup/{name}": (len(data), b64md5(data)) for name, data in files.items()}
+    objects["backup/link.rclonelink"] = (5, b64md5(b"a.txt"))
+
+    for depth in (0, 1, 5):
+        report = verify_tree(FakeObjectStorage(objects), "ns", "bucket", str(tmp_path), "backup/", depth=depth)
+        assert report["ok"], report
+        assert report["files"] == 6 and report["hashed"] == 5
+
+    bad = dict(objects)
+    del bad["backup/d/e/c.txt"]
+    bad["backup/d/b.txt"] = (4, b64md5(b"brav"))
+    bad["backup/z.txt"] = (4, b64md5(b"zero"))
+    bad["backup/d/e/f/old.txt"] = (3, b64md5(b"old"))
+    bad["backup/gone/x.txt"] = (1, b64md5(b"x"))
+    for depth in (0, 1, 5):
+        report = verify_tree(FakeObjectStorage(bad), "ns", "bucket", str(tmp_path), "backup/", depth=depth)
+        assert not report["ok"]
+        assert [entry["name"] for entry in report["missing"]] == ["d/e/c.txt"]
+        assert [entry["name"] for entry in report["size_mismatch"]] == ["d/b.txt"]
+        assert [entry["name"] for entry in report["md5_mismatch"]] == ["z.txt"]
+        assert report["counts"]["extra_in_bucket"] == 2
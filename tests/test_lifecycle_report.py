@@ -0,0 +1,42 @@
+import datetime
+from types import SimpleNamespace
+
+from lifecycle_report import evaluate_pages
+
+
+class RecordingReport:
+    def __init__(self):
+        self.added = []
+
+    def add_version(self, version, is_current, noncurrent_since):
+        self.added.append((version.name, version.time_created.day, is_current, noncurrent_since and noncurrent_since.day))
+
+
+def version(name, day, delete_marker=False):
+    created = datetime.datetime(2026, 10, day, tzinfo=datetime.timezone.utc)
+    return SimpleNamespace(name=name, size=0 if delete_marker else 10, time_created=created, time_modified=created,
+                           is_delete_marker=delete_marker)
+
+
+def test_newest_version_is_current_older_superseded_by_the_next_newer():
+    report = RecordingReport()
+    evaluate_pages(report, [(None, [version("a", 9), version("a", 5), version("a", 2), version("b", 3)])])
+    assert report.added == [("a", 9, True, None), ("a", 5, False, 9), ("a", 2, False, 5), ("b", 3, True, None)]
+
+
+def test_versions_of_a_name_split_across_pages():
+    report = RecordingReport()
+    evaluate_pages(report, [(None, [version("a", 9)]), (None, [version("a", 5), version("b", 3)])])
+    assert report.added == [("a", 9, True, None), ("a", 5, False, 9), ("b", 3, True, None)]
+
+
+def test_partitions_are_tracked_separately():
+    report = RecordingReport()
+    evaluate_pages(report, [("p1", [version("a", 9)]), ("p2", [version("a", 8)]), ("p1", [version("a", 5)])])
+    assert report.added == [("a", 9, True, None), ("a", 8, True, None), ("a", 5, False, 9)]
+
+
+def test_delete_marker_makes_every_version_previous():
+    report = RecordingReport()
+    evaluate_pages(report, [(None, [version("a", 9, delete_marker=True), version("a", 5)])])
+    assert report.added == [("a", 9, False, None), ("a", 5, False, 9)]
@@ -0,0 +1,70 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import oss_restore
+from oss_restore import RestoreFile
+
+DATA = bytes(range(256)) * 40
+
+
+def body(data):
+    def stream(size, decode_content):
+        return (data[offset:offset + size] for offset in range(0, len(data), size))
+    return SimpleNamespace(raw=SimpleNamespace(stream=stream))
+
+
+class FakeObjectStorage:
+    """get_object for one object - the range starting at fail_at raises"""
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+
+    def get_object(self, namespace_name, bucket_name, object_name, version_id=None, **kwargs):
+        start, end = 0, len(DATA) - 1
+        if kwargs.get("range"):
+            start, end = (int(value) for value in kwargs["range"][len("bytes="):].split("-"))
+        if start == self.fail_at:
+            raise OSError("connection reset")
+        return SimpleNamespace(data=body(DATA[start:end + 1]), headers={"opc-meta-mtime": "1700000000"})
+
+
+def restore(path, client, monkeypatch):
+    monkeypatch.setattr(oss_restore, "mp_threshold", 1024)
+    monkeypatch.setattr(oss_restore, "chunk_size", 4096)
+    version = SimpleNamespace(name="file", version_id="v1", size=len(DATA),
+                              time_created=datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc))
+    restore_file = RestoreFile(version, path)
+    chunks = restore_file.chunks()
+    restore_file.open(len(chunks))
+    errors = []
+    # Last range first, so the final GET to finish is not the first one
+    for byte_range in reversed(chunks):
+        try:
+            restore_file.fetch(client, "ns", "bucket", byte_range)
+        except OSError as exc:
+            errors.append(exc)
+    return errors
+
+
+def test_complete_restore_is_moved_into_place(tmp_path, monkeypatch):
+    path = tmp_path / "dir" / "file"
+    assert restore(path, FakeObjectStorage(), monkeypatch) == []
+    assert path.read_bytes() == DATA
+    assert path.stat().st_mtime == 1700000000
+    assert not path.with_name("file.partial").exists()
+
+
+@pytest.mark.parametrize("fail_at", [0, 4096, 8192])
+def test_failed_restore_leaves_nothing(tmp_path, monkeypatch, fail_at):
+    path = tmp_path / "file"
+    assert len(restore(path, FakeObjectStorage(fail_at), monkeypatch)) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_restore_keeps_the_existing_file(tmp_path, monkeypatch):
+    path = tmp_path / "file"
+    path.write_bytes(b"previous")
+    assert len(restore(path, FakeObjectStorage(0), monkeypatch)) == 1
+    assert path.read_bytes() == b"previous"
+    assert list(tmp_path.iterdir()) == [path]
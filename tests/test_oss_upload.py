@@ -0,0 +1,19 @@
+import concurrent.futures
+import functools
+
+from oss_upload import ProgressTracker
+
+
+def test_failed_upload_names_the_file(capsys):
+    tracker = ProgressTracker(30)
+    ok, failed = concurrent.futures.Future(), concurrent.futures.Future()
+    ok.add_done_callback(functools.partial(tracker.completed, "/data/ok"))
+    failed.add_done_callback(functools.partial(tracker.completed, "/data/bad"))
+    ok.set_result({"method": "put", "seconds": 0.5, "part_latencies": []})
+    failed.set_exception(OSError("connection reset"))
+    tracker.skipped("/data/gone", FileNotFoundError("no such file"))
+
+    assert tracker.files_done == 3 and tracker.errors == 2
+    assert tracker.failed_files == ["/data/bad", "/data/gone"]
+    assert tracker.put_latencies == [0.5]
+    assert "Upload failed: /data/bad: connection reset" in capsys.readouterr().out
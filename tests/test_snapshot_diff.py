@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from snapshot_diff import diff_trees
+
+
+def write(path, data="x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data)
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    """Two trees - files untouched between the snapshots are hard links, so they keep the same inode times"""
+    old, new = tmp_path / "old", tmp_path / "new"
+    for name in ["same.txt", "d/same.txt", "d/e/same.txt", "changed.txt", "deleted.txt", "gone/a.txt",
+                 "gone/sub/b.txt", "became_dir", "became_file/c.txt"]:
+        write(old / name, name)
+    os.symlink("same.txt", old / "link")
+    os.mkfifo(old / "fifo")
+
+    for name in ["same.txt", "d/same.txt", "d/e/same.txt"]:
+        (new / name).parent.mkdir(parents=True, exist_ok=True)
+        os.link(old / name, new / name)
+    os.link(old / "link", new / "link", follow_symlinks=False)
+    write(new / "changed.txt", "changed, longer")
+    write(new / "new.txt")
+    write(new / "d/e/new.txt")
+    write(new / "became_dir/inside.txt")
+    write(new / "became_file")
+    os.symlink("d", new / "new_link")
+    return old, new
+
+
+def test_diff_trees(snapshots):
+    old, new = snapshots
+    report = diff_trees(str(old), str(new), parallelism=4)
+    assert report["changed"] == ["became_dir/inside.txt", "became_file", "changed.txt", "d/e/new.txt", "new.txt",
+                                 "new_link.rclonelink"]
+    assert report["deleted"] == ["became_dir", "became_file/c.txt", "deleted.txt", "gone/a.txt", "gone/sub/b.txt"]
+    assert report["changed_bytes"] == sum(os.lstat(new / name).st_size for name in
+                                          ["became_dir/inside.txt", "became_file", "changed.txt", "d/e/new.txt",
+                                           "new.txt", "new_link"])
+
+
+def test_identical_trees(snapshots):
+    old, _ = snapshots
+    report = diff_trees(str(old), str(old))
+    assert report["changed"] == [] and report["deleted"] == []
+    assert report["directories"] == 6
+
+
+def test_unreadable_tree_raises(tmp_path):
+    with pytest.raises(OSError):
+        diff_trees(str(tmp_path / "missing"), str(tmp_path))